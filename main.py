@@ -1,25 +1,87 @@
 #!/usr/bin/env python3
 
+from __future__ import annotations
+
 import logging
 import sys
+from concurrent.futures import Future, ThreadPoolExecutor
+from copy import deepcopy
+from itertools import chain
 from pathlib import Path
+from threading import RLock
+from typing import TYPE_CHECKING
 
-from termcolor import colored, cprint
+from termcolor import colored
 
-from sleuthlib import FsEntryList, Partition, PartitionTable, check_required_tools, set_tsk_path
 from utils.argparse_utils import Arguments, parse_args
-from utils.colored_logging import init_logging_colors, print_error, print_info, print_warning
-from utils.config_parser import Config
-from utils.filelist_parser import FileList
+from utils.colored_logging import (
+    USE_COLORS,
+    format_info,
+    init_logging_colors,
+    print_error,
+    print_info,
+    print_warning,
+)
+
+if TYPE_CHECKING:
+    # Imported lazily in the functions that use them, to speed up `--help` and `--list`
+    from sleuthlib import FsEntry, FsEntryList, Partition
+    from utils.filelist_parser import FileList
 
 SCRIPT_DIR = Path(__file__ if "__file__" in globals() else sys.argv[0]).parent
 
-logging.basicConfig(
-    level=logging.WARNING,
-    format=f"[%(asctime)s] %(levelname)s ({colored('%(name)s', 'dark_grey')}) %(message)s",
-    # datefmt=f"%Y-%m-%d {colored('%H:%M:%S', attrs=['bold'])}",
-    datefmt=f"{colored('%H:%M:%S', attrs=['bold'])}",
-)
+if USE_COLORS:
+    logging.basicConfig(
+        level=logging.WARNING,
+        format=f"[%(asctime)s] %(levelname)s ({colored('%(name)s', 'dark_grey')}) %(message)s",
+        # datefmt=f"%Y-%m-%d {colored('%H:%M:%S', attrs=['bold'])}",
+        datefmt=f"{colored('%H:%M:%S', attrs=['bold'])}",
+    )
+else:
+    logging.basicConfig(
+        level=logging.WARNING,
+        format="[%(asctime)s] %(levelname)s (%(name)s) %(message)s",
+        datefmt="%H:%M:%S",
+    )
+ROOT_LOGGER = logging.getLogger()
+LOG_LEVELS = (logging.ERROR, logging.WARNING, logging.INFO, logging.DEBUG)
+"""Log levels for `--silent`, default, `-v`, and `-vv` (or more)."""
+OUTPUT_LOCK = RLock()
+"""Held while a partition writes its output, so that partitions processed in parallel
+(with `--jobs`) do not interleave their output."""
+
+
+def extract_entry(entry: FsEntry, out_dir: str | None, overwrite: bool) -> Path | None:
+    """Extracts the given file or directory entry (with its parent path) to the output directory.
+
+    Args:
+        entry: The file or directory entry to extract.
+        out_dir: The output directory.
+        overwrite: Whether to overwrite files that already exist.
+
+    Returns:
+        The path of the extracted file or directory.
+    """
+    path: Path | None
+    if entry.is_directory:
+        path, _, _ = entry.save_dir(base_path=out_dir, parents=True, overwrite=overwrite)
+    else:
+        path, _ = entry.save_file(base_path=out_dir, parents=True, overwrite=overwrite)
+    return path
+
+
+def extract_entries(entries: list[tuple[FsEntry, bool]], out_dir: str | None) -> list[Path | None]:
+    """Extracts the given entries one after the other, in order (see `extract_entry`).
+
+    Args:
+        entries: The file or directory entries to extract, with whether to overwrite files
+            that already exist.
+        out_dir: The output directory.
+
+    Returns:
+        The paths of the extracted files or directories.
+    """
+    return [extract_entry(entry, out_dir, overwrite) for entry, overwrite in entries]
 
 
 def process_files(
@@ -28,8 +90,12 @@ def process_files(
     args: Arguments,
     out_dir: str | None = None,
     extra_vars: dict[str, str] = {},
+    header: str | None = None,
 ) -> None:
     """Extracts or lists files from the given list of files in the given root entries.
+    The entries matching the files are all extracted concurrently, then tools are run on them
+    in order. The output (starting with `header`, if given) is written while holding
+    `OUTPUT_LOCK`, so that it is not interleaved with the output of other partitions.
 
     Args:
         file_list: The list of files to extract or list.
@@ -37,34 +103,75 @@ def process_files(
         args: The parsed arguments from the CLI.
         out_dir: The output directory.
         extra_vars: Extra variables to pass to the tools.
+        header: Text to write before the output of the files (eg. the partition banner).
     """
     if out_dir is None:
         out_dir = args.out_dir
 
-    for file in file_list:
-        entries = root_entries.find_path(file.path)
-        for entry in entries:
-            if args.ls:
-                print(entry.short_desc())
-                continue
+    files_entries = [(file, root_entries.find_path(file.parts)) for file in file_list]
 
-            if not args.silent:
-                print_info(f"Extracting: {entry.short_desc()}")
-            path: Path | None
-            if entry.is_directory:
-                path, _, _ = entry.save_dir(
-                    base_path=out_dir, parents=True, overwrite=file.overwrite
-                )
-            else:
-                path, _ = entry.save_file(base_path=out_dir, parents=True, overwrite=file.overwrite)
-            for tool in file.tools:
+    if args.ls:
+        # Write the whole listing at once, instead of one `print` call per entry
+        lines = [] if header is None else [header]
+        lines.extend(f"{entry.short_desc()}\n" for _, entries in files_entries for entry in entries)
+        with OUTPUT_LOCK:
+            sys.stdout.write("".join(lines))
+        return
+
+    from sleuthlib import extraction_executor
+
+    # Each extraction runs TSK tools in subprocesses, so they can run in parallel,
+    # except for entries with the same path (eg. deleted and current versions of a file,
+    # or a file matched by several paths of the list) which are extracted to the same
+    # destination, and must be written in order.
+    by_destination: dict[str, list[tuple[int, int]]] = {}
+    for file_index, (_, entries) in enumerate(files_entries):
+        for entry_index, entry in enumerate(entries):
+            destination = str(entry.path).lower() if entry.case_insensitive else str(entry.path)
+            by_destination.setdefault(destination, []).append((file_index, entry_index))
+
+    def group_entries(indexes: list[tuple[int, int]]) -> list[tuple[FsEntry, bool]]:
+        return [(files_entries[f][1][e], files_entries[f][0].overwrite) for f, e in indexes]
+
+    executor = extraction_executor()
+    futures: list[tuple[list[tuple[int, int]], Future[list[Path | None]]]] = []
+    inline: list[list[tuple[int, int]]] = []
+    for indexes in by_destination.values():
+        if any(entry.is_directory for entry, _ in group_entries(indexes)):
+            # Directories are saved with the same executor, so they cannot be saved in it
+            # (their files are still extracted concurrently)
+            inline.append(indexes)
+        else:
+            futures.append(
+                (indexes, executor.submit(extract_entries, group_entries(indexes), out_dir))
+            )
+    paths: list[list[Path | None]] = [[None] * len(entries) for _, entries in files_entries]
+    for indexes in inline:
+        for (f, e), path in zip(indexes, extract_entries(group_entries(indexes), out_dir)):
+            paths[f][e] = path
+    for indexes, future in futures:
+        for (f, e), path in zip(indexes, future.result()):
+            paths[f][e] = path
+
+    # Tools write directly to the console, so the output cannot be buffered
+    with OUTPUT_LOCK:
+        if header is not None:
+            sys.stdout.write(header)
+        for (file, entries), file_paths in zip(files_entries, paths):
+            for entry, path in zip(entries, file_paths):
+                # Printed with the tools of the entry, as they were all extracted in the meantime
                 if not args.silent:
-                    print_info(f"Running {tool}...")
-                ret = tool.run(path, out_dir, entry.path, extra_vars=extra_vars, silent=args.silent)
-                if not args.silent and ret is None:
-                    print_info("Tool did not run (disabled, filter mismatch, or run_once)")
-                if not (ret is None or args.silent or tool.output):
-                    print()  # Add an empty line after each tool that ran
+                    print_info(f"Extracting: {entry.short_desc()}")
+                for tool in file.tools:
+                    if not args.silent:
+                        print_info(f"Running {tool}...")
+                    ret = tool.run(
+                        path, out_dir, entry.path, extra_vars=extra_vars, silent=args.silent
+                    )
+                    if not args.silent and ret is None:
+                        print_info("Tool did not run (disabled, filter mismatch, or run_once)")
+                    if not (ret is None or args.silent or tool.output):
+                        print()  # Add an empty line after each tool that ran
 
 
 def process_partition(
@@ -86,21 +193,43 @@ def process_partition(
     if out_dir is None:
         out_dir = args.out_dir
 
+    banner: str | None = None
     if not args.silent:
-        print()
         if args.ls:
-            print_info(f"Listing files in partition {part_num} ({partition.short_desc()})")
+            banner = f"Listing files in partition {part_num} ({partition.short_desc()})"
         else:
-            print_info(f"Extracting partition {part_num} ({partition.short_desc()}) to '{out_dir}'")
+            banner = f"Extracting partition {part_num} ({partition.short_desc()}) to '{out_dir}'"
+        banner = f"\n{format_info(banner)}\n"
 
-    root_entries = partition.root_entries(case_insensitive=not args.case_sensitive)
+    root_entries = partition.root_entries(
+        case_insensitive=not args.case_sensitive, recursive=args.save_all
+    )
 
     if args.save_all:
+        if banner is not None:
+            with OUTPUT_LOCK:
+                sys.stdout.write(banner)
         root_entries.save_all(base_path=out_dir)
         return
 
     file_list.reset_tools()
-    process_files(file_list, root_entries, args, out_dir, extra_vars={"PARTITION": str(part_num)})
+    process_files(
+        file_list,
+        root_entries,
+        args,
+        out_dir,
+        extra_vars={"PARTITION": str(part_num)},
+        header=banner,
+    )
+
+
+def largest_partition(partitions: list[Partition]) -> int:
+    """Returns the index of the largest partition in the list (the first one in case of a tie)."""
+    best_num, best_len = 0, -1
+    for num, part in enumerate(partitions):
+        if part.length > best_len:
+            best_num, best_len = num, part.length
+    return best_num
 
 
 def choose_partitions(partitions: list[Partition]) -> list[int]:
@@ -112,14 +241,20 @@ def choose_partitions(partitions: list[Partition]) -> list[int]:
     Returns:
         The list of partition numbers chosen by the user.
     """
-    default_part = max(enumerate(partitions), key=lambda i_p: i_p[1].length)[0]
-    print("Please select the partition number(s) to use:")
-    print()
-    cprint(" NUM", "green", attrs=["bold"], end="")
-    cprint(f" > {PartitionTable.partlist_header()}", attrs=["bold"])
-    for num, part in enumerate(partitions):
-        print(f"  {colored(f'{num:>2}', 'green', attrs=['bold'])} > {part}")
-    print()
+    from sleuthlib import PartitionTable
+
+    default_part = largest_partition(partitions)
+    lines = [
+        "Please select the partition number(s) to use:\n\n",
+        colored(" NUM", "green", attrs=["bold"]),
+        colored(f" > {PartitionTable.partlist_header()}", attrs=["bold"]) + "\n",
+    ]
+    lines.extend(
+        f"  {colored(f'{num:>2}', 'green', attrs=['bold'])} > {part}\n"
+        for num, part in enumerate(partitions)
+    )
+    lines.append("\n")
+    sys.stdout.write("".join(lines))
     try:
         user_input = input(
             "Partition number(s) (space- or comma-separated) "
@@ -137,30 +272,21 @@ def choose_partitions(partitions: list[Partition]) -> list[int]:
 def main() -> None:
     """The main function of the script.
     Parses the arguments, processes the image, and extracts/lists the files."""
-    init_logging_colors()
     args = parse_args()
+    init_logging_colors()
 
-    if args.verbose > 1:
-        logging.getLogger().setLevel(logging.DEBUG)
-    elif args.verbose == 1:
-        logging.getLogger().setLevel(logging.INFO)
-    elif args.silent:
-        logging.getLogger().setLevel(logging.ERROR)
+    # `--silent` and `--verbose` are mutually exclusive
+    ROOT_LOGGER.setLevel(LOG_LEVELS[0 if args.silent else 1 + min(args.verbose, 2)])
+
+    from sleuthlib import PartitionTable, check_required_tools, set_cache_dir, set_tsk_path
 
     set_tsk_path(args.tsk_path)
+    set_cache_dir(args.cache_dir)
     try:
         check_required_tools()
     except FileNotFoundError as e:
         print_error(str(e), exit_code=1)
 
-    config = Config.from_yaml_file(args.config if args.config else SCRIPT_DIR / "config.yaml")
-    file_list = FileList.empty(config)
-    if args.file is not None:
-        file_list.extend(args.file)
-    if args.file_list is not None:
-        for yaml_file in args.file_list:
-            file_list += FileList.from_yaml_file(yaml_file, config)
-
     res_mmls = PartitionTable.from_image_files(
         args.image,
         vstype=args.vstype,
@@ -168,17 +294,35 @@ def main() -> None:
         sector_size=args.sector_size,
         offset=args.offset,
     )
-    if args.file is None and args.file_list is None:
-        if args.part_num is None and not args.ask_part:
-            if not args.ls:
-                print_warning(
-                    "No partition and no files given, only showing partition information:"
-                )
-            print(res_mmls)
-            return
-        if args.ls:
-            print_warning("No files to list, showing all files in /")
-            file_list.append("*")
+    no_files = args.file is None and args.file_list is None
+    if no_files and args.part_num is None and not args.ask_part:
+        if not args.ls:
+            print_warning("No partition and no files given, only showing partition information:")
+        sys.stdout.write(f"{res_mmls}\n")
+        return
+
+    from utils.config_parser import Config
+    from utils.filelist_parser import FileList
+
+    config = Config.from_yaml_file(args.config if args.config else SCRIPT_DIR / "config.yaml")
+    file_list = FileList.empty(config)
+    # Build the list in a single pass (one sort), removing duplicate paths given on the CLI
+    # (compared once normalized, and only normalized once, as `normalize_path` is not idempotent)
+    cli_files: dict[str, FileList.File] = {}
+    for path in args.file or ():
+        file = FileList.File.from_str(path, file_list)
+        cli_files.setdefault(file.path, file)
+    file_list.extend(
+        chain(
+            cli_files.values(),
+            chain.from_iterable(
+                FileList.from_yaml_file(yaml_file, config) for yaml_file in args.file_list or ()
+            ),
+        )
+    )
+    if no_files and args.ls:
+        print_warning("No files to list, showing all files in /")
+        file_list.append("*")
 
     partitions = res_mmls.filesystem_partitions()
 
@@ -190,24 +334,31 @@ def main() -> None:
             part_nums = choose_partitions(partitions)
         else:
             print_info("No partition specified, selecting all NTFS partitions...")
-            part_nums = [i for i, part in enumerate(partitions) if part.is_ntfs]
+            # Each check lists the root of the partition with `fls` (reused when processing it),
+            # so they are run concurrently
+            with ThreadPoolExecutor() as executor:
+                is_ntfs = list(executor.map(lambda part: part.is_ntfs, partitions))
+            part_nums = [i for i, ntfs in enumerate(is_ntfs) if ntfs]
     else:
         part_nums = args.part_num
 
-    if not all(0 <= part_num < len(partitions) for part_num in part_nums):
+    nb_parts = len(partitions)
+    if invalid := [part_num for part_num in part_nums if not 0 <= part_num < nb_parts]:
         valid = "0"
-        if len(partitions) > 1:
-            valid += f"-{len(partitions) - 1}"
+        if nb_parts > 1:
+            valid += f"-{nb_parts - 1}"
         print_error(
-            f"Invalid partition number(s): {', '.join(str(part_num) for part_num in part_nums)} "
+            f"Invalid partition number(s): {', '.join(map(str, invalid))} "
             f"(valid: {colored(valid, attrs=['bold'])})",
             exit_code=1,
         )
 
     if not args.silent:
-        print_info("Selected partition(s):")
-        for part_num in part_nums:
-            print(f"    - {part_num}: {partitions[part_num].short_desc()}")
+        lines = [f"{format_info('Selected partition(s):')}\n"]
+        lines.extend(
+            f"    - {part_num}: {partitions[part_num].short_desc()}\n" for part_num in part_nums
+        )
+        sys.stdout.write("".join(lines))
 
     if not args.save_all:
         if not file_list:
@@ -215,14 +366,33 @@ def main() -> None:
                 print_warning(f"No files to {'list' if args.ls else 'extract'}")
             return
         if not args.silent:
-            print_info(f"Files to {'list' if args.ls else 'extract'}:")
-            for file in file_list:
-                print(f"    - {file.path}")
+            action = "list" if args.ls else "extract"
+            lines = [f"{format_info(f'Files to {action}:')}\n"]
+            lines.extend(f"    - {file.path}\n" for file in file_list)
+            sys.stdout.write("".join(lines))
 
     out_dir_base = args.out_dir if args.out_dir is not None else "extracted"
-    for part_num in part_nums:
-        out_dir = f"{out_dir_base}_{part_num}" if len(part_nums) > 1 else out_dir_base
-        process_partition(partitions[part_num], part_num, file_list, args, out_dir=out_dir)
+    if args.jobs > 1 and len(part_nums) > 1:
+        # Each partition gets its own copy of the file list, as it keeps track of tools that ran.
+        # All the partitions extract their files with the same executor (see `process_files`).
+        with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+            futures = [
+                executor.submit(
+                    process_partition,
+                    partitions[part_num],
+                    part_num,
+                    deepcopy(file_list),
+                    args,
+                    out_dir=f"{out_dir_base}_{part_num}",
+                )
+                for part_num in part_nums
+            ]
+            for future in futures:
+                future.result()
+    else:
+        for part_num in part_nums:
+            out_dir = f"{out_dir_base}_{part_num}" if len(part_nums) > 1 else out_dir_base
+            process_partition(partitions[part_num], part_num, file_list, args, out_dir=out_dir)
 
     if not args.silent:
         print_info("Done")
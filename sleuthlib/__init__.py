@@ -1,10 +1,14 @@
-from typing import Any, Iterable
+from __future__ import annotations
 
-from .fls_types import FsEntry, FsEntryList
-from .icat_wrapper import icat
-from .mmls_types import Partition, PartitionTable
-from .types import ImgType, VsType
-from .utils import check_required_tools, set_tsk_path
+from importlib import import_module
+from typing import TYPE_CHECKING, Any, Iterable
+
+if TYPE_CHECKING:
+    from .fls_types import FsEntry, FsEntryList, extraction_executor
+    from .icat_wrapper import icat
+    from .mmls_types import Partition, PartitionTable
+    from .types import ImgType, VsType
+    from .utils import check_required_tools, set_cache_dir, set_tsk_path
 
 __all__ = [
     "mmls",
@@ -12,12 +16,38 @@ __all__ = [
     "icat",
     "check_required_tools",
     "set_tsk_path",
+    "set_cache_dir",
     "Partition",
     "PartitionTable",
     "FsEntry",
     "FsEntryList",
+    "extraction_executor",
 ]
 
+# The submodules are only imported when one of their names is first used, so that importing
+# `sleuthlib.types` alone (eg. for the CLI choices, before parsing the arguments) stays cheap
+_LAZY_NAMES = {
+    "FsEntry": "fls_types",
+    "FsEntryList": "fls_types",
+    "extraction_executor": "fls_types",
+    "icat": "icat_wrapper",
+    "Partition": "mmls_types",
+    "PartitionTable": "mmls_types",
+    "ImgType": "types",
+    "VsType": "types",
+    "check_required_tools": "utils",
+    "set_cache_dir": "utils",
+    "set_tsk_path": "utils",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if (module := _LAZY_NAMES.get(name)) is None:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+    value = getattr(import_module(f".{module}", __name__), name)
+    globals()[name] = value  # Only look it up once
+    return value
+
 
 def mmls(
     image_files: str | Iterable[str],
@@ -37,6 +67,8 @@ def mmls(
         offset: Offset to use for the start of the volume.
         **kwargs: Additional arguments to pass to `run_program`.
     """
+    from .mmls_types import PartitionTable
+
     return PartitionTable.from_image_files(
         image_files, vstype, imgtype, sector_size, offset, **kwargs
     )
@@ -53,4 +85,6 @@ def fls(
         case_insensitive: Whether to use case-insensitive matching (for FAT/NFTS partitions)
         **kwargs: Additional arguments to pass to `run_program`.
     """
+    from .fls_types import FsEntryList
+
     return FsEntryList.from_partition(partition, root, case_insensitive, **kwargs)
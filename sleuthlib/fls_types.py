@@ -1,17 +1,22 @@
 from __future__ import annotations
 
+import fnmatch
 import logging
 import re
 import sys
-from dataclasses import dataclass
-from functools import cache, cached_property
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import cache, cached_property, lru_cache
 from pathlib import Path, PurePath, PurePosixPath, PureWindowsPath
-from typing import Any, BinaryIO, Iterable, Iterator, overload
+from typing import TYPE_CHECKING, Any, BinaryIO, Iterable, Iterator, overload
 
-from .icat_wrapper import icat
-from .mmls_types import Partition
+from .icat_wrapper import icat, icat_to_file
 from .types import FsEntryType, MetaAddress
-from .utils import run_program
+from .utils import run_program_lines_cached
+
+if TYPE_CHECKING:
+    # Only used in annotations (`mmls_types` imports this module)
+    from .mmls_types import Partition
 
 if sys.version_info >= (3, 11):
     from typing import Self
@@ -20,8 +25,23 @@ else:
 
 LOGGER = logging.getLogger(__name__)
 
-
-@dataclass(frozen=True)
+_GLOB_CHARS = frozenset("*?[")
+_ENTRY_TYPES = {entry_type.value: entry_type for entry_type in FsEntryType}
+"""Lookup table for `FsEntryType` (faster than calling the Enum constructor for each entry)."""
+_DIRECTORY_TYPES = frozenset(entry_type for entry_type in FsEntryType if entry_type.is_directory)
+"""The directory `FsEntryType`s (a set lookup is faster than the `is_directory` property)."""
+_TYPE_CLASS = f"[{''.join(re.escape(entry_type) for entry_type in _ENTRY_TYPES)}]"
+"""Regex character class matching a valid `FsEntryType` value."""
+_RE_ENTRY = re.compile(
+    rf"^({_TYPE_CLASS})/({_TYPE_CLASS}) (?:(\*) )?({MetaAddress.ADDRESS_PATTERN})"
+    r"(\(realloc\))?:\t(.+)$",
+    re.ASCII,  # `fls` writes ASCII addresses: `\d` does not need to check Unicode digits
+)
+_ENTRY_MATCH = _RE_ENTRY.match
+"""Bound `match` method of the fls entry regex (avoids attribute lookups in the parsing loop)."""
+
+
+@dataclass(frozen=True, slots=True)
 class FsEntry:
     """A file system entry, representing a file or directory in a partition."""
 
@@ -34,8 +54,15 @@ class FsEntry:
     is_reallocated: bool = False
     parent: FsEntry | None = None
     case_insensitive: bool = False
+    inode: int = field(init=False, repr=False, compare=False)
+    """The numeric inode of the entry."""
+    is_directory: bool = field(init=False, repr=False, compare=False)
+    """Whether the entry is a directory."""
+    _name_path: PurePath | None = field(default=None, init=False, repr=False, compare=False)
+    _path: PurePath | None = field(default=None, init=False, repr=False, compare=False)
+    _children: FsEntryList | None = field(default=None, init=False, repr=False, compare=False)
 
-    _RE_ENTRY = re.compile(r"^(.)/(.) (?:(\*) )?([^*]+?)(\(realloc\))?:\t(.+)$")
+    _RE_ENTRY = _RE_ENTRY
 
     @classmethod
     def from_str(
@@ -46,83 +73,176 @@ class FsEntry:
         case_insensitive: bool | None = None,
     ) -> Self:
         """Creates a `FsEntry` instance from a line of the output of `fls`."""
-        if (m := cls._RE_ENTRY.match(line)) is None:
+        LOGGER.debug("Creating FsEntry from string: %s", line)
+        return cls.from_lines((line,), partition, parent, case_insensitive)[0]
+
+    @classmethod
+    def from_lines(
+        cls,
+        lines: Iterable[str],
+        partition: Partition,
+        parent: FsEntry | None = None,
+        case_insensitive: bool | None = None,
+    ) -> list[Self]:
+        """Creates `FsEntry` instances from the lines of the output of `fls`, in a single batch.
+        Everything that does not depend on the line (regex, type lookups, case sensitivity)
+        is resolved once for the whole batch instead of once per entry."""
+        if case_insensitive is None:
+            case_insensitive = parent.case_insensitive if parent is not None else False
+        match = _ENTRY_MATCH
+        from_match = cls._from_match
+        entries: list[Self] = []
+        for line in lines:
+            if (m := match(line)) is None:
+                raise ValueError(f"Invalid fs entry string: {line}")
+            entries.append(from_match(m, partition, parent, case_insensitive))
+        LOGGER.debug("Created %d FsEntry instances from fls output", len(entries))
+        return entries
+
+    @classmethod
+    def tree_from_lines(
+        cls,
+        lines: Iterable[str],
+        partition: Partition,
+        parent: FsEntry | None = None,
+        case_insensitive: bool | None = None,
+    ) -> list[Self]:
+        """Creates `FsEntry` instances from the lines of the output of `fls -r`,
+        where the entries are prefixed with one `+` per level of depth.
+        The children of each listed directory are stored in it, so that `children()`
+        does not need to run `fls` again. Directories without any listed child are left unloaded
+        (`fls` may not have recursed into them), so `children()` lists them on its own.
+        Returns the top-level entries."""
+        if case_insensitive is None:
+            case_insensitive = parent.case_insensitive if parent is not None else False
+        top_level: list[Self] = []
+        # Stack of (directory, children) for the current entry and its ancestors
+        stack: list[tuple[FsEntry | None, list[Self]]] = [(parent, top_level)]
+        last: Self | None = None
+        count = 0
+        for line in lines:
+            entry_str = line.lstrip("+")
+            if depth := len(line) - len(entry_str):
+                entry_str = entry_str[1:]  # Remove the space after the `+` prefix
+                if depth == len(stack) and last is not None:
+                    stack.append((last, []))  # First child of the previous entry
+                elif depth >= len(stack):
+                    raise ValueError(f"Invalid fs entry depth: {line}")
+            for directory, children in stack[depth + 1 :]:
+                object.__setattr__(directory, "_children", FsEntryList(list(children)))
+            del stack[depth + 1 :]
+            last = cls._from_line(entry_str, partition, stack[-1][0], case_insensitive)
+            stack[-1][1].append(last)
+            count += 1
+        for directory, children in stack[1:]:
+            object.__setattr__(directory, "_children", FsEntryList(list(children)))
+        LOGGER.debug("Created %d FsEntry instances from recursive fls output", count)
+        return top_level
+
+    @classmethod
+    def _from_line(
+        cls, line: str, partition: Partition, parent: FsEntry | None, case_insensitive: bool
+    ) -> Self:
+        if (m := _ENTRY_MATCH(line)) is None:
             raise ValueError(f"Invalid fs entry string: {line}")
-        LOGGER.debug(f"Creating FsEntry from string: {line}")
-        type_filename = FsEntryType(m.group(1))
-        type_metadata = FsEntryType(m.group(2))
-        is_deleted = m.group(3) is not None
-        meta_address = MetaAddress(m.group(4))
-        is_reallocated = m.group(5) is not None
-        name = m.group(6)
+        return cls._from_match(m, partition, parent, case_insensitive)
+
+    @classmethod
+    def _from_match(
+        cls,
+        m: re.Match[str],
+        partition: Partition,
+        parent: FsEntry | None,
+        case_insensitive: bool,
+    ) -> Self:
+        """Creates a `FsEntry` instance from a match of `_RE_ENTRY` (without matching it again)."""
+        type_filename, type_metadata, deleted, address, realloc, name = m.groups()
         return cls(
-            name,
-            meta_address,
-            type_filename,
-            type_metadata,
+            sys.intern(name),  # Many names repeat across directories (`desktop.ini`, `$I30`...)
+            MetaAddress.from_validated(address),  # Validated by the regex
+            _ENTRY_TYPES[type_filename],
+            _ENTRY_TYPES[type_metadata],
             partition,
-            is_deleted,
-            is_reallocated,
+            deleted is not None,
+            realloc is not None,
             parent,
-            (
-                case_insensitive
-                if case_insensitive is not None
-                else (parent.case_insensitive if parent is not None else False)
-            ),
+            case_insensitive,
         )
 
-    @cached_property
-    def inode(self) -> int:
-        """The numeric inode of the entry."""
-        return self.meta_address.inode
-
-    @cached_property
-    def is_directory(self) -> bool:
-        """Whether the entry is a directory."""
-        return self.type_filename.is_directory or self.type_metadata.is_directory
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "inode", self.meta_address.inode)
+        object.__setattr__(
+            self,
+            "is_directory",
+            self.type_filename in _DIRECTORY_TYPES or self.type_metadata in _DIRECTORY_TYPES,
+        )
 
-    @cached_property
+    @property
     def name_path(self) -> PurePath:
-        """The entry name with the correct underlying PurePath implementation (Windows/Posix)."""
-        return (PureWindowsPath if self.case_insensitive else PurePosixPath)(self.name)
-
-    @cached_property
+        """The entry name with the correct underlying PurePath implementation (Windows/Posix).
+        Computed on first access (most listed entries never need it)."""
+        if (name_path := self._name_path) is None:
+            name_path = (PureWindowsPath if self.case_insensitive else PurePosixPath)(self.name)
+            object.__setattr__(self, "_name_path", name_path)
+        return name_path
+
+    @property
     def path(self) -> PurePath:
-        """The full path of the entry, including the parent path if available."""
-        return self.parent.path / self.name_path if self.parent else self.name_path
+        """The full path of the entry, including the parent path if available.
+        Computed on first access (most listed entries never need it)."""
+        if (path := self._path) is None:
+            # Joining the name directly avoids building `name_path` for every entry
+            path = self.parent.path / self.name if self.parent else self.name_path
+            object.__setattr__(self, "_path", path)
+        return path
 
-    @cache
     def name_eq(self, name: str) -> bool:
         """Checks if the entry name is equal to the given name, optionally case-insensitive."""
         if self.case_insensitive:
             return self.name.lower() == name.lower()
         return self.name == name
 
-    @cache
     def name_matches(self, pattern: str) -> bool:
         """Checks if the entry name matches the given glob pattern."""
-        return self.name_path.match(pattern)
+        if not pattern or "/" in pattern or (self.case_insensitive and "\\" in pattern):
+            return self.name_path.match(pattern)
+        # Single-component patterns are compiled once, instead of being parsed on each call
+        if self.case_insensitive:
+            return _glob_regex(pattern.lower()).match(self.name.lower()) is not None
+        return _glob_regex(pattern).match(self.name) is not None
 
-    @cache
     def children(self) -> FsEntryList:
         """Returns the children of the entry, if it is a directory. Raises ValueError otherwise."""
+        if (children := self._children) is None:
+            if not self.is_directory:
+                raise ValueError(f"'{self.path}' is not a directory")
+            children = FsEntryList.from_partition(self.partition, self, self.case_insensitive)
+            object.__setattr__(self, "_children", children)
+        return children
+
+    def load_tree(self) -> None:
+        """Lists the whole directory tree under the entry with a single `fls -r` call,
+        instead of one `fls` call per directory when walking it with `children()`.
+        Raises ValueError if the entry is not a directory."""
+        if self._children is not None:
+            return
         if not self.is_directory:
             raise ValueError(f"'{self.path}' is not a directory")
-        return FsEntryList.from_partition(self.partition, self, self.case_insensitive)
+        children = FsEntryList.from_partition(
+            self.partition, self, self.case_insensitive, recursive=True
+        )
+        object.__setattr__(self, "_children", children)
 
-    @cache
     def child(self, name: str) -> FsEntry:
         """Returns the child entry with the given name. Raises IndexError if not found."""
         children = self.children()
         return children.find_entry(name)
 
-    @cache
     def children_find(self, name: str) -> FsEntryList:
         """Returns the children entries with the given name (supports glob patterns)."""
         children = self.children()
         return children.find_entries(name)
 
-    @cache
     def children_path(self, path: str | PurePath) -> FsEntryList:
         """Returns the children entries with the given path (supports glob patterns)."""
         children = self.children()
@@ -152,17 +272,11 @@ class FsEntry:
             base_path = Path(base_path)
         base_path /= path
         LOGGER.info(f"Saving contents of '{self.path}' to '{base_path}'")
-        base_path.mkdir(exist_ok=True, parents=True)
-        nb_files = 0
-        nb_dirs = 1
-        for child in self.children():
-            if child.is_directory:
-                _, nf, nd = child.save_dir(base_path=base_path, overwrite=overwrite)
-                nb_files += nf
-                nb_dirs += nd
-            else:
-                child.save_file(base_path=base_path, overwrite=overwrite)
-                nb_files += 1
+        self.load_tree()
+        dirs = [base_path]
+        files: list[tuple[FsEntry, Path]] = []
+        _plan_tree(self.children(), base_path, dirs, files)
+        nb_files, nb_dirs = _save_planned(dirs, files, overwrite)
         LOGGER.info(
             f"Saved {nb_files} file{'s' if nb_files > 1 else ''} and {nb_dirs} "
             f"director{'ies' if nb_dirs > 1 else 'y'} to '{base_path}'"
@@ -217,10 +331,11 @@ class FsEntry:
             base_path.mkdir(exist_ok=True, parents=True)
             file = base_path / file
             if not overwrite and file.exists():
-                LOGGER.info(f"File '{file}' already exists, skipping...")
+                LOGGER.info("File '%s' already exists, skipping...", file)
                 return file, 0
             filepath: Path | None = file
-            file = open(file, "wb")
+            # The data is copied in large chunks, so the file does not need a write buffer
+            file = open(file, "wb", buffering=0)
             must_close = True
         elif base_path is not None:
             raise ValueError("Cannot specify base_path with a file-like object")
@@ -229,17 +344,20 @@ class FsEntry:
         else:
             filepath = Path(file.name) if isinstance(file.name, str) else None
 
-        LOGGER.info(f"Saving file '{self.path}' to '{filepath}'")
+        # Only build the path of the entry if it is logged (this runs for every extracted file)
+        if LOGGER.isEnabledFor(logging.INFO):
+            LOGGER.info("Saving file '%s' to '%s'", self.path, filepath)
         try:
-            data = self.dump_file()
-            count = file.write(data)
-            LOGGER.info(f"Written {count} bytes to '{filepath}'")
+            if self.is_directory:
+                raise ValueError(f"'{self.path}' is a directory")
+            count = icat_to_file(self.partition, self.meta_address, file)
+            LOGGER.info("Written %d bytes to '%s'", count, filepath)
             return filepath, count
         finally:
             if must_close:
                 file.close()
 
-    @cached_property
+    @property
     def attributes(self) -> str:
         """The attributes of the entry as a string (`deleted`, `reallocated`)."""
         attribs: list[str] = []
@@ -255,6 +373,11 @@ class FsEntry:
             f"{self.type_filename.value}/{self.type_metadata.value}: {self.path}{self.attributes}"
         )
 
+    def __hash__(self) -> int:
+        # Only hash what identifies the entry in its directory: the generated hash would also hash
+        # the partition and, recursively, all the parents (equal entries still hash the same)
+        return hash((self.name, self.meta_address.address))
+
     def __str__(self) -> str:
         return (
             f"{self.type_filename.value}/{self.type_metadata.value} "
@@ -268,6 +391,14 @@ class FsEntryList:
     Provides methods to search and save entries, and acts as a container of `FsEntry` instances."""
 
     entries: list[FsEntry]
+    # Per-list caches (rather than `functools.cache`, which would hash the whole list on each call,
+    # and keep every list alive)
+    _entries_cache: dict[str, FsEntryList] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+    _prefix_cache: dict[tuple[str, ...], FsEntryList] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
 
     @classmethod
     def from_partition(
@@ -275,6 +406,7 @@ class FsEntryList:
         partition: Partition,
         root: FsEntry | None = None,
         case_insensitive: bool = False,
+        recursive: bool = False,
         **kwargs: Any,
     ) -> Self:
         """Runs the `fls` tool to list files in a partition.
@@ -283,9 +415,13 @@ class FsEntryList:
             partition: The partition to list files from.
             root: The root entry to list files from.
             case_insensitive: Whether to use case-insensitive matching (for FAT/NFTS partitions)
+            recursive: Whether to list the whole tree (the children of the directories are
+                loaded, but only the top-level entries are returned).
             **kwargs: Additional arguments to pass to `run_program`.
         """
         args: list[str] = []
+        if recursive:
+            args += ["-r"]  # Recurse into directories
         # args += ["-p"]  # Show full path
         args += ["-o", str(partition.start)]  # Image offset
         if partition.partition_table.img_type is not None:
@@ -294,62 +430,117 @@ class FsEntryList:
         if root is not None:
             args.append(str(root.meta_address.address))
 
-        res = run_program("fls", args, logger=LOGGER, encoding="utf-8", **kwargs)
-        return cls(
-            [FsEntry.from_str(line, partition, root, case_insensitive) for line in res.splitlines()]
+        lines = run_program_lines_cached(
+            "fls",
+            args,
+            partition.partition_table.image_files,
+            logger=LOGGER,
+            encoding="utf-8",
+            **kwargs,
         )
+        if recursive:
+            return cls(FsEntry.tree_from_lines(lines, partition, root, case_insensitive))
+        return cls(FsEntry.from_lines(lines, partition, root, case_insensitive))
+
+    @cached_property
+    def _entries_by_name(self) -> dict[str, list[FsEntry]]:
+        """Index of the entries by lower-cased name, to avoid scanning the whole list
+        (the exact case is then checked for case-sensitive entries)."""
+        index: dict[str, list[FsEntry]] = {}
+        for entry in self.entries:
+            index.setdefault(entry.name.lower(), []).append(entry)
+        return index
+
+    def _entries_named(self, name: str) -> list[FsEntry]:
+        """Returns the entries with the given name (no glob patterns), in list order."""
+        # Same as `ent.name_eq(name)`, without lower-casing the names again for each candidate
+        return [
+            ent
+            for ent in self._entries_by_name.get(name.lower(), ())
+            if ent.case_insensitive or ent.name == name
+        ]
 
-    @cache
     def find_entry(self, name: str) -> FsEntry:
         """Finds the entry with the given name. Raises IndexError if not found."""
-        if (entry := next((f for f in self.entries if f.name_eq(name)), None)) is None:
+        if not (entries := self._entries_named(name)):
             raise IndexError(f"No entry found with name '{name}'")
-        LOGGER.debug(f"Found entry: '{entry}'")
+        entry = entries[0]
+        LOGGER.debug("Found entry: '%s'", entry)
         return entry
 
-    @cache
     def find_entries(self, name: str) -> FsEntryList:
-        """Finds all entries with the given name (supports glob patterns)."""
-        if entries := [ent for ent in self.entries if ent.name_matches(name)]:
-            LOGGER.debug(f"Found entries: {', '.join(str(entry.path) for entry in entries)}")
+        """Finds all entries with the given name (supports glob patterns).
+        Results are cached in the list, by name."""
+        if (cached := self._entries_cache.get(name)) is not None:
+            return cached
+        if name and _GLOB_CHARS.isdisjoint(name):
+            entries = self._entries_named(name)
+        else:
+            # Same semantics as `FsEntry.name_matches`, but the pattern is only compiled once
+            match = _glob_regex(name).match
+            match_lower = _glob_regex(name.lower()).match
+            entries = [
+                ent
+                for ent in self.entries
+                if (match_lower(ent.name.lower()) if ent.case_insensitive else match(ent.name))
+            ]
+        # The messages are only formatted if debug logging is enabled (building the paths is costly)
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            if entries:
+                LOGGER.debug("Found entries: %s", ", ".join(str(entry.path) for entry in entries))
+            else:
+                LOGGER.debug("No entries found with name matching '%s'", name)
+        found = self._entries_cache[name] = FsEntryList(entries)
+        return found
+
+    def find_path(self, path: str | PurePath | tuple[str, ...]) -> FsEntryList:
+        """Finds all entries with the given path (supports glob patterns),
+        walking down the directory tree one component at a time.
+        The path can also be given as a tuple of already split components, to skip parsing it.
+        Results (and intermediate results) are cached by path prefix, so that paths sharing
+        a common parent (eg. `Windows/System32/config/*`) only resolve that parent once."""
+        if isinstance(path, tuple):
+            parts = path
+        else:
+            if isinstance(path, str):
+                path = PurePath(path.replace("\\", "/"))
+            if path.is_absolute():
+                raise ValueError("Path must be relative")
+            parts = path.parts
+        # Start from the longest prefix that was already resolved
+        for depth in range(len(parts), 0, -1):
+            if (entries := self._prefix_cache.get(parts[:depth])) is not None:
+                break
         else:
-            LOGGER.debug(f"No entries found with name matching '{name}'")
-        return FsEntryList(entries)
-
-    @cache
-    def find_path(self, path: str | PurePath) -> FsEntryList:
-        """Finds all entries with the given path (supports glob patterns)."""
-        if isinstance(path, str):
-            path = PurePath(path.replace("\\", "/"))
-        if path.is_absolute():
-            raise ValueError("Path must be relative")
-        parts = path.parts
-        entries = self.find_entries(parts[0])
-        for part in parts[1:]:
-            ent_tmp = FsEntryList.empty()
-            for entry in entries:
-                if entry.is_directory:
-                    ent_tmp += entry.children()
-            entries = ent_tmp.find_entries(part)
+            depth = 1
+            entries = self._prefix_cache[parts[:1]] = self.find_entries(parts[0])
+        for depth in range(depth, len(parts)):
+            # Look the component up in each directory (using its name index), rather than
+            # in a new list made of all their children
+            part = parts[depth]
+            entries = self._prefix_cache[parts[: depth + 1]] = FsEntryList(
+                [
+                    child
+                    for entry in entries
+                    if entry.is_directory
+                    for child in entry.children_find(part)
+                ]
+            )
         return entries
 
     def save_all(self, base_path: str | Path | None = None) -> tuple[Path, int, int]:
-        """Recursively saves all entries to the given base path."""
+        """Recursively saves all entries to the given base path.
+        The directory trees are listed first (see `FsEntry.load_tree`), then the files are
+        extracted in inode order, which roughly follows the order of the metadata on disk."""
         if base_path is None:
             base_path = Path(".")
         else:
             base_path = Path(base_path)
             base_path.mkdir(exist_ok=True, parents=True)
-        nb_files = 0
-        nb_dirs = 0
-        for entry in self:
-            if entry.is_directory:
-                _, nf, nd = entry.save_dir(base_path=base_path)
-                nb_files += nf
-                nb_dirs += nd
-            else:
-                entry.save_file(base_path=base_path)
-                nb_files += 1
+        dirs: list[Path] = []
+        files: list[tuple[FsEntry, Path]] = []
+        _plan_tree(self, base_path, dirs, files)
+        nb_files, nb_dirs = _save_planned(dirs, files, overwrite=True)
         LOGGER.info(
             f"Saved {nb_files} file{'s' if nb_files > 1 else ''} and {nb_dirs} "
             f"director{'ies' if nb_dirs > 1 else 'y'} to '{base_path}'"
@@ -366,7 +557,7 @@ class FsEntryList:
 
     def __contains__(self, item: str | FsEntry) -> bool:
         if isinstance(item, str):
-            return any(f.name == item for f in self.entries)
+            return any(f.name == item for f in self._entries_by_name.get(item.lower(), ()))
         return item in self.entries
 
     @overload
@@ -385,13 +576,96 @@ class FsEntryList:
         return len(self.entries)
 
     def __add__(self, other: Iterable[FsEntry]) -> FsEntryList:
-        return FsEntryList(self.entries + list(other))
+        return FsEntryList(self.entries + _as_list(other))
 
     def __radd__(self, other: Iterable[FsEntry]) -> FsEntryList:
-        return FsEntryList(list(other) + self.entries)
+        return FsEntryList(_as_list(other) + self.entries)
 
     def __str__(self) -> str:
-        return "\n".join(str(e) for e in self.entries)
+        return "\n".join(map(str, self.entries))
 
     def __hash__(self) -> int:
         return hash(tuple(self.entries))
+
+
+def _as_list(entries: Iterable[FsEntry]) -> list[FsEntry]:
+    """Returns the entries as a list, without copying lists or the entries of a `FsEntryList`
+    (the result is only read, to be concatenated)."""
+    if isinstance(entries, FsEntryList):
+        return entries.entries
+    return entries if isinstance(entries, list) else list(entries)
+
+
+@lru_cache(maxsize=256)
+def _glob_regex(pattern: str) -> re.Pattern[str]:
+    """Compiles a glob pattern (for a single name) to a regex."""
+    return re.compile(fnmatch.translate(pattern))
+
+
+def _plan_tree(
+    entries: Iterable[FsEntry],
+    base_path: Path,
+    dirs: list[Path],
+    files: list[tuple[FsEntry, Path]],
+) -> None:
+    """Collects the directories to create and the files to save (with their destination
+    directory) to recursively save the given entries to the base path.
+    The tree is walked depth-first with an explicit stack (in the same order as a recursive walk),
+    so that deep trees do not hit the recursion limit."""
+    stack: list[tuple[Iterator[FsEntry], Path]] = [(iter(entries), base_path)]
+    while stack:
+        children, parent_path = stack[-1]
+        for entry in children:
+            if entry.is_directory:
+                path = parent_path / entry.name_path
+                dirs.append(path)
+                entry.load_tree()
+                stack.append((iter(entry.children()), path))
+                break
+            files.append((entry, parent_path))
+        else:
+            stack.pop()
+
+
+def _save_planned(
+    dirs: list[Path], files: list[tuple[FsEntry, Path]], overwrite: bool
+) -> tuple[int, int]:
+    """Creates the planned directories, then saves the planned files in inode order.
+    Each file is extracted by its own `icat` process, so they are run concurrently to amortize
+    their startup time. Files with the same destination (eg. a deleted and a current version)
+    are still saved one after the other in listing order, so that the same version is kept
+    as when walking the tree.
+    Returns the number of files and directories saved."""
+    # Directories with the same destination (eg. deleted and current versions) are created once
+    for path in dict.fromkeys(dirs):
+        path.mkdir(exist_ok=True, parents=True)
+    by_destination: dict[tuple[Path, str], list[tuple[FsEntry, Path]]] = {}
+    for entry, path in files:
+        by_destination.setdefault((path, entry.name.lower()), []).append((entry, path))
+    executor = extraction_executor()
+    futures = [
+        executor.submit(_save_group, group, overwrite)
+        for group in sorted(by_destination.values(), key=lambda group: group[0][0].inode)
+    ]
+    try:
+        for future in futures:
+            future.result()
+    except BaseException:
+        for future in futures:
+            future.cancel()  # Do not start the remaining extractions
+        raise
+    return len(files), len(dirs)
+
+
+def _save_group(group: list[tuple[FsEntry, Path]], overwrite: bool) -> None:
+    for entry, path in group:
+        entry.save_file(base_path=path, overwrite=overwrite)
+
+
+@cache
+def extraction_executor() -> ThreadPoolExecutor:
+    """The thread pool used to run `icat` processes concurrently, shared by all extractions
+    to bound the number of processes. Its tasks must not submit other tasks (eg. by saving
+    a directory), so that it cannot deadlock: only submit tasks that save single files.
+    """
+    return ThreadPoolExecutor(thread_name_prefix="icat")
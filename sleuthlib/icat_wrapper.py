@@ -1,9 +1,14 @@
+from __future__ import annotations
+
 import logging
-from typing import Any
+from typing import TYPE_CHECKING, Any, BinaryIO
 
-from .mmls_types import Partition
 from .types import MetaAddress
-from .utils import run_program
+from .utils import run_program, run_program_to_file
+
+if TYPE_CHECKING:
+    # Only used in annotations (`mmls_types` imports this module through `fls_types`)
+    from .mmls_types import Partition
 
 LOGGER = logging.getLogger(__name__)
 
@@ -15,6 +20,23 @@ def icat(partition: Partition, inode: MetaAddress, **kwargs: Any) -> bytes:
         partition: The partition to extract the file from.
         inode: The inode to extract.
         **kwargs: Additional arguments to pass to `run_program`."""
+    return run_program("icat", _icat_args(partition, inode), logger=LOGGER, encoding=None, **kwargs)
+
+
+def icat_to_file(partition: Partition, inode: MetaAddress, file: BinaryIO, **kwargs: Any) -> int:
+    """Runs the `icat` tool to extract a file from a partition, writing it to the given file
+    while it is extracted (instead of loading the whole file in memory).
+    Returns the number of bytes written.
+
+    Args:
+        partition: The partition to extract the file from.
+        inode: The inode to extract.
+        file: The file-like object to write the contents to.
+        **kwargs: Additional arguments to pass to `run_program_to_file`."""
+    return run_program_to_file("icat", _icat_args(partition, inode), file, logger=LOGGER, **kwargs)
+
+
+def _icat_args(partition: Partition, inode: MetaAddress) -> list[str]:
     args: list[str] = []
     args.append("-r")  # Recover deleted files
     args += ["-o", str(partition.start)]  # Image offset
@@ -22,6 +44,4 @@ def icat(partition: Partition, inode: MetaAddress, **kwargs: Any) -> bytes:
         args += ["-i", partition.partition_table.img_type]  # Image type
     args.extend(partition.partition_table.image_files)
     args.append(inode.address)
-
-    res = run_program("icat", args, logger=LOGGER, encoding=None, **kwargs)
-    return res
+    return args
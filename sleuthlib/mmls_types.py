@@ -3,13 +3,13 @@ from __future__ import annotations
 import logging
 import re
 import sys
-from dataclasses import dataclass
-from functools import cache, cached_property
+from dataclasses import dataclass, field
+from functools import cached_property, lru_cache
 from typing import Any, Iterable
 
 from . import fls_types
 from .types import ImgType, PartTableType, Sectors, VsType
-from .utils import pretty_size, run_program
+from .utils import file_mtimes, get_program_path, pretty_size, run_program_lines_cached
 
 if sys.version_info >= (3, 11):
     from typing import Self
@@ -18,6 +18,9 @@ else:
 
 LOGGER = logging.getLogger(__name__)
 
+_RE_PARTITION = re.compile(r"^\s*(\d+):\s*(\S+)\s+(\d+)\s+(\d+)\s+(\d+)\s+(.+)$")
+_PARTITION_MATCH = _RE_PARTITION.match
+
 
 @dataclass(frozen=True)
 class Partition:
@@ -30,13 +33,23 @@ class Partition:
     length: Sectors
     description: str
     partition_table: PartitionTable
-
-    _RE_PARTITION = re.compile(r"^\s*(\d+):\s*(\S+)\s+(\d+)\s+(\d+)\s+(\d+)\s+(.+)$")
+    start_bytes: int = field(init=False, repr=False, compare=False)
+    """The partition starting offset, in bytes."""
+    end_bytes: int = field(init=False, repr=False, compare=False)
+    """The partition ending offset, in bytes."""
+    length_bytes: int = field(init=False, repr=False, compare=False)
+    """The partition length, in bytes."""
+    _root_entries_cache: dict[tuple[bool, bool], fls_types.FsEntryList] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+    _is_ntfs_cache: bool | None = field(default=None, init=False, repr=False, compare=False)
+
+    _RE_PARTITION = _RE_PARTITION
 
     @classmethod
     def from_str(cls, line: str, partition_table: PartitionTable) -> Self:
         """Creates a `Partition` instance from a line of the output of `mmls`."""
-        if (m := cls._RE_PARTITION.match(line)) is None:
+        if (m := _PARTITION_MATCH(line)) is None:
             raise ValueError(f"Invalid partition string: {line}")
         LOGGER.debug(f"Creating Partition from string: {line}")
         id = int(m.group(1))
@@ -47,43 +60,51 @@ class Partition:
         description = m.group(6)
         return cls(id, slot, start, end, length, description, partition_table)
 
-    @cached_property
-    def start_bytes(self) -> int:
-        """The partition starting offset, in bytes."""
-        return self.partition_table.sectors_to_bytes(self.start)
-
-    @cached_property
-    def end_bytes(self) -> int:
-        """The partition ending offset, in bytes."""
-        return self.partition_table.sectors_to_bytes(self.end)
-
-    @cached_property
-    def length_bytes(self) -> int:
-        """The partition length, in bytes."""
-        return self.partition_table.sectors_to_bytes(self.length)
+    def __post_init__(self) -> None:
+        sector_size = self.partition_table.sector_size
+        object.__setattr__(self, "start_bytes", self.start * sector_size)
+        object.__setattr__(self, "end_bytes", self.end * sector_size)
+        object.__setattr__(self, "length_bytes", self.length * sector_size)
 
     @cached_property
     def is_filesystem(self) -> bool:
         """Returns whether the partition is a filesystem partition (ie. has a slot number)."""
         return self.slot.replace(":", "").isdecimal()
 
-    @cached_property
+    @property
     def is_ntfs(self) -> bool:
-        """Returns whether the partition is an NTFS partition (ie. has a `$MFT` entry)."""
-        try:
-            return "$MFT" in self.root_entries(can_fail=True)
-        except ChildProcessError:
-            return False
+        """Returns whether the partition is an NTFS partition (ie. has a `$MFT` entry).
+        The result is cached on the instance (not with `cached_property`, which locks all
+        the instances at once before Python 3.12, so partitions could not be checked in parallel).
+        """
+        if (is_ntfs := self._is_ntfs_cache) is None:
+            try:
+                is_ntfs = "$MFT" in self.root_entries(can_fail=True)
+            except ChildProcessError:
+                is_ntfs = False
+            object.__setattr__(self, "_is_ntfs_cache", is_ntfs)
+        return is_ntfs
 
-    @cache
     def root_entries(
-        self, case_insensitive: bool = True, can_fail: bool = False
+        self, case_insensitive: bool = True, can_fail: bool = False, recursive: bool = False
     ) -> fls_types.FsEntryList:
         """Returns the root entries of the partition, using the `fls` tool.
-        Results are cached to avoid unnecessary re-runs of the tool."""
-        return fls_types.FsEntryList.from_partition(
-            self, case_insensitive=case_insensitive, can_fail=can_fail, silent_stderr=can_fail
-        )
+        If `recursive` is True, the whole tree is listed at once (eg. to save everything).
+        Results are cached to avoid unnecessary re-runs of the tool: a successful listing
+        is reused whatever `can_fail` is, and a recursive listing also serves non-recursive calls.
+        """
+        cached = self._root_entries_cache
+        if (entries := cached.get((case_insensitive, recursive))) is None and not recursive:
+            entries = cached.get((case_insensitive, True))
+        if entries is None:
+            entries = cached[case_insensitive, recursive] = fls_types.FsEntryList.from_partition(
+                self,
+                case_insensitive=case_insensitive,
+                recursive=recursive,
+                can_fail=can_fail,
+                silent_stderr=can_fail,
+            )
+        return entries
 
     def short_desc(self) -> str:
         """A short description of the partition: `description [ID id, size_bytes]`."""
@@ -112,20 +133,35 @@ class PartitionTable:
     sector_size: int = 512
     img_type: ImgType | None = None
 
-    _RE_OFFSET = re.compile(r"^\s*Offset Sector: (\d+)\s*$")
-    _RE_SECTOR_SIZE = re.compile(r"^\s*Units are in (\d+)-byte sectors\s*$")
+    _PARTLIST_HEADER = (
+        "ID : Slot           Start (bytes)          End (bytes)  "
+        "     Length (bytes)  Description"
+    )
 
     @classmethod
     def from_str(cls, s: str, image_files: Iterable[str], imgtype: ImgType | None = None) -> Self:
         """Creates a `PartitionTable` instance from the output of `mmls`."""
-        lines = s.splitlines()
-        part_table_type = PartTableType.from_str(lines.pop(0))
-        if (m := cls._RE_OFFSET.match(lines.pop(0))) is None:
+        return cls.from_lines(s.splitlines(), image_files, imgtype)
+
+    @classmethod
+    def from_lines(
+        cls, lines: Iterable[str], image_files: Iterable[str], imgtype: ImgType | None = None
+    ) -> Self:
+        """Creates a `PartitionTable` instance from the lines of the output of `mmls`
+        (can be an iterator over the output of the running tool)."""
+        lines = iter(lines)
+        part_table_type = PartTableType.from_str(next(lines, ""))
+        # Fixed-format header lines: `Offset Sector: N` and `Units are in N-byte sectors`
+        line = next(lines, "").strip()
+        value = line.removeprefix("Offset Sector: ")
+        if not (value.isdecimal() and len(value) == len(line) - len("Offset Sector: ")):
             raise ValueError("Could not find partition table offset")
-        offset = Sectors(int(m.group(1)))
-        if (m := cls._RE_SECTOR_SIZE.match(lines.pop(0))) is None:
+        offset = Sectors(int(value))
+        line = next(lines, "").strip()
+        value = line.removeprefix("Units are in ").removesuffix("-byte sectors")
+        if not (value.isdecimal() and len(value) == len(line) - len("Units are in -byte sectors")):
             raise ValueError("Could not find sector size")
-        sector_size = int(m.group(1))
+        sector_size = int(value)
         part_table = cls(tuple(image_files), part_table_type, [], offset, sector_size, imgtype)
         for line in lines:
             try:
@@ -154,7 +190,52 @@ class PartitionTable:
             sector_size: Sector size to use.
             offset: Offset to use for the start of the volume.
             **kwargs: Additional arguments to pass to `run_program`.
+
+        The most recent results are cached for identical arguments and `mmls` executable,
+        as long as the image files are not modified (not when `kwargs` are given).
+        A cached table is shared by all the callers, with its partitions and their listings,
+        so it must not be modified.
         """
+        image_files = (image_files,) if isinstance(image_files, str) else tuple(image_files)
+        if kwargs:
+            # They may not be hashable, and may change how the output is read
+            return cls._run_mmls(image_files, vstype, imgtype, sector_size, offset, **kwargs)
+        return cls._from_image_files_cached(
+            image_files,
+            file_mtimes(image_files),
+            get_program_path("mmls"),
+            vstype,
+            imgtype,
+            sector_size,
+            offset,
+        )
+
+    @classmethod
+    @lru_cache(maxsize=8)  # Bounded, as each table keeps the fls listings of its partitions alive
+    def _from_image_files_cached(
+        cls,
+        image_files: tuple[str, ...],
+        mtimes: tuple[int | None, ...],
+        mmls_path: str,
+        vstype: VsType | None,
+        imgtype: ImgType | None,
+        sector_size: int | None,
+        offset: int | None,
+    ) -> Self:
+        # `mtimes` and `mmls_path` are only used as part of the cache key, to re-run `mmls`
+        # if an image changed, or if another `mmls` would be used (eg. after `set_tsk_path`)
+        return cls._run_mmls(image_files, vstype, imgtype, sector_size, offset)
+
+    @classmethod
+    def _run_mmls(
+        cls,
+        image_files: tuple[str, ...],
+        vstype: VsType | None,
+        imgtype: ImgType | None,
+        sector_size: int | None,
+        offset: int | None,
+        **kwargs: Any,
+    ) -> Self:
         args: list[str] = []
         if vstype is not None:
             args += ["-t", vstype]
@@ -164,12 +245,12 @@ class PartitionTable:
             args += ["-b", str(sector_size)]
         if offset is not None:
             args += ["-o", str(offset)]
-        if isinstance(image_files, str):
-            image_files = (image_files,)
         args.extend(image_files)
 
-        res = run_program("mmls", args, logger=LOGGER, encoding="utf-8", **kwargs)
-        return cls.from_str(res, image_files, imgtype)
+        lines = run_program_lines_cached(
+            "mmls", args, image_files, logger=LOGGER, encoding="utf-8", **kwargs
+        )
+        return cls.from_lines(lines, image_files, imgtype)
 
     def sectors_to_bytes(self, sectors: Sectors) -> int:
         """Converts a number of sectors to bytes using the sector size."""
@@ -183,24 +264,25 @@ class PartitionTable:
     @staticmethod
     def partlist_header() -> str:
         """Returns the column names for the output of `Partition.__str__`."""
-        return (
-            "ID : Slot           Start (bytes)          End (bytes)  "
-            "     Length (bytes)  Description"
-        )
+        return PartitionTable._PARTLIST_HEADER
 
-    @cache
-    def filesystem_partitions(self) -> list[Partition]:
-        """Returns the list of filesystem partitions from this partition table."""
+    @cached_property
+    def _filesystem_partitions(self) -> list[Partition]:
         return [p for p in self.partitions if p.is_filesystem]
 
+    def filesystem_partitions(self) -> list[Partition]:
+        """Returns the list of filesystem partitions from this partition table.
+        The list is computed once and cached on the instance."""
+        return self._filesystem_partitions
+
     def __str__(self) -> str:
         return (
             f"Type: {self.part_table_type} [{self.part_table_type.value}]\n"
             f"Offset: {self.offset} ({self.offset_bytes} B)\n"
             f"Sector size: {self.sector_size} B\n"
             "Partitions:\n"
-            f"   {self.partlist_header()}\n"
-        ) + "\n".join(f" * {str(p)}" for p in self.partitions)
+            f"   {self._PARTLIST_HEADER}\n"
+        ) + "\n".join([f" * {p}" for p in self.partitions])
 
     def __hash__(self) -> int:
         return hash(
@@ -1,9 +1,8 @@
 from __future__ import annotations
 
 import re
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
-from functools import cache, cached_property
 from typing import Literal, NewType, TypeAlias
 
 PART_TABLE_TYPES = {
@@ -57,16 +56,16 @@ class PartTableType(str, Enum):
 
     @staticmethod
     def from_str(s: str) -> PartTableType:
-        s = s.strip()
-        return next(
-            (PartTableType(t) for t, desc in PART_TABLE_TYPES.items() if desc == s),
-            PartTableType.UNKNOWN,
-        )
+        return _PART_TABLE_TYPES_BY_DESC.get(s.strip(), PartTableType.UNKNOWN)
 
     def __str__(self) -> str:
         return PART_TABLE_TYPES.get(self.value, "Unknown")
 
 
+_PART_TABLE_TYPES_BY_DESC = {desc: PartTableType(t) for t, desc in PART_TABLE_TYPES.items()}
+"""Reverse mapping of `PART_TABLE_TYPES` (description -> `PartTableType`)."""
+
+
 class FsEntryType(str, Enum):
     UNKNOWN = "-"
     REGULAR = "r"
@@ -83,30 +82,56 @@ class FsEntryType(str, Enum):
 
     @property
     def is_directory(self) -> bool:
-        return self in {self.__class__.DIRECTORY, self.__class__.VIRTUAL_DIRECTORY}
+        return self is FsEntryType.DIRECTORY or self is FsEntryType.VIRTUAL_DIRECTORY
 
     def __str__(self) -> str:
         return FS_ENTRY_TYPES.get(self.value, "Unknown")
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class MetaAddress:
     """Represents a metadata address in a filesystem.
     In NTFS, this is a string in the form "1304-128-1".
     In other filesystems, this is an integer."""
 
     address: str
+    inode: int = field(init=False, repr=False, compare=False)
+    """The inode number (the first part of the address in NTFS)."""
+    _is_ntfs: bool = field(init=False, repr=False, compare=False)
 
+    ADDRESS_PATTERN = r"\d+(?:-\d+-\d+)?"
+    """Regex pattern matching a valid address (to embed in other patterns)."""
     RE_NTFS_ADDRESS = re.compile(r"^\d+-\d+-\d+$")
 
     def __post_init__(self) -> None:
-        if not (self.address.isdecimal() or MetaAddress.RE_NTFS_ADDRESS.match(self.address)):
+        if not _is_valid_address(self.address):
             raise ValueError(f"Invalid metadata address: {self.address}")
+        self._set_derived_fields()
+
+    @classmethod
+    def from_validated(cls, address: str) -> MetaAddress:
+        """Creates a `MetaAddress` without validating the address again.
+        The address must already have been matched with `ADDRESS_PATTERN`."""
+        meta_address = object.__new__(cls)
+        object.__setattr__(meta_address, "address", address)
+        meta_address._set_derived_fields()
+        return meta_address
+
+    def _set_derived_fields(self) -> None:
+        inode, sep, _ = self.address.partition("-")
+        object.__setattr__(self, "inode", int(inode))
+        object.__setattr__(self, "_is_ntfs", bool(sep))
 
-    @cache
     def is_ntfs(self) -> bool:
-        return not self.address.isdecimal()
-
-    @cached_property
-    def inode(self) -> int:
-        return int(self.address.split("-", 1)[0])
+        return self._is_ntfs
+
+
+def _is_valid_address(address: str) -> bool:
+    """Whether the address matches `MetaAddress.ADDRESS_PATTERN`, checked with string methods
+    (`str.isdecimal` accepts the same digits as `\\d`), which is faster than the regex."""
+    if address.isdecimal():
+        return True
+    parts = address.split("-")
+    return (
+        len(parts) == 3 and parts[0].isdecimal() and parts[1].isdecimal() and parts[2].isdecimal()
+    )
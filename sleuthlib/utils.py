@@ -1,18 +1,35 @@
+import hashlib
+import json
+import os
+import queue
 import shutil
 import subprocess
+import tempfile
+from contextlib import contextmanager
+from functools import cache, lru_cache
 from logging import Logger
 from sys import exit
-from typing import overload
+from typing import Any, BinaryIO, Iterable, Iterator, overload
 
 SIZE_UNITS = ["B", "K", "M", "G", "T", "P"]
 REQUIRED_TOOLS = ["mmls", "fls", "icat"]
 
+COPY_BUFFER_SIZE = 1 << 20
+"""The size of the buffers used to copy the output of programs to files."""
+
 TSK_PATH: str | None = None
 """The path to The Sleuth Kit tools."""
+CACHE_DIR: str | None = None
+"""The directory where the output of the TSK tools is cached between runs (if set)."""
+
+_BUFFER_POOL: queue.SimpleQueue[bytearray] = queue.SimpleQueue()
+"""Pool of reusable copy buffers (one is allocated per concurrent copy, then reused)."""
 
 
+@lru_cache(maxsize=1024)
 def pretty_size(size: int, compact: bool = True) -> str:
     """Converts a size in bytes to a human-readable string.
+    Results are cached, as the same sizes are formatted repeatedly (eg. partition offsets).
 
     Args:
         size: The size in bytes.
@@ -31,25 +48,60 @@ def pretty_size(size: int, compact: bool = True) -> str:
     return f"{size}{unit}"
 
 
+def file_mtimes(paths: Iterable[str]) -> tuple[int | None, ...]:
+    """Returns the modification times (in nanoseconds) of the given files,
+    or `None` for files that cannot be accessed. Useful as a cache key."""
+    mtimes: list[int | None] = []
+    for path in paths:
+        try:
+            mtimes.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            mtimes.append(None)
+    return tuple(mtimes)
+
+
 def set_tsk_path(path: str | None) -> None:
     """Sets the path to The Sleuth Kit tools."""
     global TSK_PATH
     TSK_PATH = path
 
 
+def set_cache_dir(path: str | None) -> None:
+    """Sets the directory where the output of the TSK tools is cached (None to disable caching)."""
+    global CACHE_DIR
+    CACHE_DIR = path
+
+
 def get_program_path(name: str) -> str:
     """Returns the path to the given program, or raises an exception if it's not found.
-    Searches in the PATH environment variable or in the TSK_PATH directory, if set."""
-    if (path := shutil.which(name, path=TSK_PATH)) is None:
-        raise FileNotFoundError(f"{name} not found in {'PATH' if TSK_PATH is None else TSK_PATH}")
+    Searches in the PATH environment variable or in the TSK_PATH directory, if set.
+    Successful lookups are cached for the current TSK_PATH and PATH."""
+    return _get_program_path(name, TSK_PATH, os.environ.get("PATH"))
+
+
+@cache
+def _get_program_path(name: str, tsk_path: str | None, env_path: str | None) -> str:
+    # `env_path` is only used as part of the cache key, since `shutil.which` reads it from `environ`
+    if (path := shutil.which(name, path=tsk_path)) is None:
+        raise FileNotFoundError(f"{name} not found in {'PATH' if tsk_path is None else tsk_path}")
     return path
 
 
 def check_required_tools() -> None:
     """Checks if the required tools are available in TSK_PATH or PATH
-    (required tools are `mmls`, `fls`, and `icat`)."""
-    for tool in REQUIRED_TOOLS:
-        get_program_path(tool)
+    (required tools are `mmls`, `fls`, and `icat`).
+    Raises FileNotFoundError listing all the missing tools.
+    Successful checks are cached for the current TSK_PATH and PATH."""
+    _check_required_tools(TSK_PATH, os.environ.get("PATH"))
+
+
+@cache
+def _check_required_tools(tsk_path: str | None, env_path: str | None) -> None:
+    # `env_path` is only used as part of the cache key, since `shutil.which` reads it from `environ`
+    if missing := [tool for tool in REQUIRED_TOOLS if shutil.which(tool, path=tsk_path) is None]:
+        raise FileNotFoundError(
+            f"{', '.join(missing)} not found in {'PATH' if tsk_path is None else tsk_path}"
+        )
 
 
 @overload
@@ -123,3 +175,174 @@ def run_program(
             raise ChildProcessError(str(e))
         logger.critical(f"Error running {name}: {e}")
         exit(e.returncode)
+
+
+def run_program_lines(
+    name: str,
+    args: list[str],
+    logger: Logger,
+    encoding: str = "utf-8",
+    can_fail: bool = False,
+    silent_stderr: bool = False,
+) -> Iterator[str]:
+    """Runs a program with the given arguments, like `run_program`, but yields its output
+    line by line (without line endings) while it runs, instead of returning it all at the end.
+    Errors are handled like in `run_program`, once the whole output has been read.
+
+    Args:
+        name: The name of the program.
+        args: The arguments to pass to the program.
+        logger: The logger to use.
+        encoding: The encoding to use for the output.
+        can_fail: Whether the program can fail without raising an exception.
+        silent_stderr: Whether to suppress stderr output.
+    """
+    logger.debug(f"Running {name} {' '.join(args)}")
+    cmd = [get_program_path(name)] + args
+    nb_lines = 0
+    with subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL if silent_stderr else None,
+        encoding=encoding,
+    ) as proc:
+        assert proc.stdout is not None
+        for line in proc.stdout:
+            nb_lines += 1
+            yield line.rstrip("\n")
+    if proc.returncode != 0:
+        e = subprocess.CalledProcessError(proc.returncode, cmd)
+        if can_fail:
+            logger.debug(f"{name} failed: {e}")
+            raise ChildProcessError(str(e))
+        logger.critical(f"Error running {name}: {e}")
+        exit(e.returncode)
+    logger.debug(f"{name} returned {nb_lines} lines")
+
+
+@contextmanager
+def _pooled_buffer() -> Iterator[bytearray]:
+    """Borrows a copy buffer from the pool (allocating it if none is available)."""
+    try:
+        buffer = _BUFFER_POOL.get_nowait()
+    except queue.Empty:
+        buffer = bytearray(COPY_BUFFER_SIZE)
+    try:
+        yield buffer
+    finally:
+        _BUFFER_POOL.put(buffer)
+
+
+def run_program_to_file(
+    name: str,
+    args: list[str],
+    file: BinaryIO,
+    logger: Logger,
+    can_fail: bool = False,
+    silent_stderr: bool = False,
+) -> int:
+    """Runs a program with the given arguments, like `run_program`, but copies its output
+    to the given file while it runs (through a reusable buffer), instead of returning it.
+    Errors are handled like in `run_program`. Returns the number of bytes written.
+
+    Args:
+        name: The name of the program.
+        args: The arguments to pass to the program.
+        file: The file-like object to write the output to.
+        logger: The logger to use.
+        can_fail: Whether the program can fail without raising an exception.
+        silent_stderr: Whether to suppress stderr output.
+    """
+    logger.debug(f"Running {name} {' '.join(args)}")
+    cmd = [get_program_path(name)] + args
+    count = 0
+    with (
+        _pooled_buffer() as buffer,
+        subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL if silent_stderr else None,
+            bufsize=0,
+        ) as proc,
+    ):
+        assert proc.stdout is not None
+        # The view must be released before the buffer goes back to the pool, even on errors
+        with memoryview(buffer) as view:
+            while size := proc.stdout.readinto(view):  # type: ignore[attr-defined]
+                written = 0
+                while written < size:  # Unbuffered (raw) files may only write part of the data
+                    with view[written:size] as chunk:
+                        written += file.write(chunk)
+                count += size
+    if proc.returncode != 0:
+        e = subprocess.CalledProcessError(proc.returncode, cmd)
+        if can_fail:
+            logger.debug(f"{name} failed: {e}")
+            raise ChildProcessError(str(e))
+        logger.critical(f"Error running {name}: {e}")
+        exit(e.returncode)
+    logger.debug(f"{name} returned {count} bytes")
+    return count
+
+
+def run_program_lines_cached(
+    name: str,
+    args: list[str],
+    files: Iterable[str],
+    logger: Logger,
+    encoding: str = "utf-8",
+    **kwargs: Any,
+) -> Iterator[str]:
+    """Runs a program like `run_program_lines`, caching its output in CACHE_DIR (if set).
+    The cache key is a hash of the program name, its arguments, and the path, size,
+    and modification time of the executable and of the given input files, so that the cache
+    is invalidated if any of them changes (eg. when another TSK version is used).
+    The output is only cached if the program succeeded.
+
+    Args:
+        name: The name of the program.
+        args: The arguments to pass to the program.
+        files: The input files read by the program (usually the image files).
+        logger: The logger to use.
+        encoding: The encoding to use for the output.
+        **kwargs: Additional arguments to pass to `run_program_lines`.
+    """
+    if CACHE_DIR is None:
+        yield from run_program_lines(name, args, logger, encoding, **kwargs)
+        return
+
+    key: list[Any] = [name, args]
+    try:
+        for file in (get_program_path(name), *files):
+            st = os.stat(file)
+            key.append([os.path.abspath(file), st.st_size, st.st_mtime_ns])
+    except OSError:
+        # Let the program report the error
+        yield from run_program_lines(name, args, logger, encoding, **kwargs)
+        return
+    digest = hashlib.sha256(json.dumps(key).encode()).hexdigest()
+    cache_file = os.path.join(CACHE_DIR, name, f"{digest}.txt")
+
+    try:
+        with open(cache_file, encoding=encoding) as f:
+            logger.debug(f"Using cached output of {name} {' '.join(args)}")
+            for line in f:
+                yield line.rstrip("\n")
+        return
+    except FileNotFoundError:
+        pass
+
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    # Write to a temporary file first, so that an interrupted run does not leave a partial output
+    with tempfile.NamedTemporaryFile(
+        "w", encoding=encoding, dir=os.path.dirname(cache_file), suffix=".tmp", delete=False
+    ) as tmp:
+        try:
+            for line in run_program_lines(name, args, logger, encoding, **kwargs):
+                tmp.write(f"{line}\n")
+                yield line
+        except BaseException:
+            tmp.close()
+            os.remove(tmp.name)
+            raise
+    os.replace(tmp.name, cache_file)
@@ -0,0 +1,70 @@
+import pytest
+
+from utils.argparse_utils import *
+from utils.argparse_utils import _parse_args_argparse, _parse_args_fast
+
+
+class TestParseArgs:
+
+    def test_fast_path(self):
+
+        args = parse_args(["disk.E01", "-F", "files.yaml", "-f", "a", "b", "-p", "2", "2", "-vv"])
+
+        assert args.image == ["disk.E01"]
+        assert args.file_list == ["files.yaml"]
+        assert args.file == ["a", "b"]
+        assert args.part_num == [2]
+        assert args.verbose == 2
+        assert not args.ls
+        assert args.vstype is None
+
+        # Inline values and clustered flags
+        args = parse_args(["-tgpt", "--out-dir=out", "-lS", "disk1", "disk2"])
+
+        assert args.image == ["disk1", "disk2"]
+        assert args.vstype == "gpt"
+        assert args.out_dir == "out"
+        assert args.ls and args.case_sensitive
+
+    def test_short_option_equals(self):
+
+        # Like argparse, a `=` between a short option and its value is not part of the value
+        for argv in (
+            ["-F=assets/files4.yaml", "img.E01"],
+            ["img.E01", "-d=out", "-p=1", "-t=gpt"],
+            ["img.E01", "-f==a"],
+        ):
+            fast = _parse_args_fast(argv)
+            assert fast is not None
+            assert fast == _parse_args_argparse(argv)
+
+        assert parse_args(["-F=assets/files4.yaml", "img.E01"]).file_list == ["assets/files4.yaml"]
+
+    def test_repeated_options(self):
+
+        args = parse_args(["disk", "-f", "a", "-F", "x.yaml", "-f", "b", "c", "--file-list=y.yaml"])
+
+        assert args.file == ["a", "b", "c"]
+        assert args.file_list == ["x.yaml", "y.yaml"]
+
+        # An inline value only takes one argument, the next ones are positional
+        args = parse_args(["--file=a", "disk1", "disk2"])
+
+        assert args.file == ["a"]
+        assert args.image == ["disk1", "disk2"]
+
+    def test_fallback(self):
+
+        # Anything unusual is left to argparse
+        assert _parse_args_fast(["disk", "-t", "list"]) is None
+        assert _parse_args_fast(["disk", "-b", "12"]) is None
+        assert _parse_args_fast(["disk", "-l", "-a"]) is None
+        assert _parse_args_fast(["disk", "-a", "-f", "a"]) is None
+        assert _parse_args_fast(["disk", "--help"]) is None
+        assert _parse_args_fast(["-l"]) is None
+
+        # Long option abbreviations are handled by argparse
+        assert parse_args(["disk", "--verb"]).verbose == 1
+
+        with pytest.raises(SystemExit):
+            parse_args(["disk", "-s", "-v"])
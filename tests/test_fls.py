@@ -0,0 +1,105 @@
+import pytest
+
+from sleuthlib.fls_types import *
+from sleuthlib.types import *
+
+
+class TestFlsTypes:
+
+    def test_from_lines(self):
+
+        lines = [
+            "d/d 64-144-5:\tWindows",
+            "r/r * 1304-128-1(realloc):\tpagefile.sys",
+            "V/V 256:\t$OrphanFiles",
+        ]
+        entries = FsEntry.from_lines(lines, None, case_insensitive=True)
+
+        assert [e.name for e in entries] == ["Windows", "pagefile.sys", "$OrphanFiles"]
+        assert entries[0].is_directory and entries[0].inode == 64
+        assert entries[1].type_filename == FsEntryType.REGULAR
+        assert entries[1].is_deleted and entries[1].is_reallocated
+        assert not entries[1].is_directory
+        assert entries[2].is_directory and entries[2].meta_address.address == "256"
+        assert all(e.case_insensitive for e in entries)
+
+        with pytest.raises(ValueError):
+            FsEntry.from_lines(["r/r 12-3:\tinvalid"], None)
+        with pytest.raises(ValueError):
+            FsEntry.from_lines(["x/r 12:\tinvalid"], None)
+
+    def test_tree_from_lines(self):
+
+        lines = [
+            "d/d 64-144-5:\tWindows",
+            "+ d/d 65-144-1:\tSystem32",
+            "++ r/r 66-128-1:\tcmd.exe",
+            "+ r/r 67-128-1:\twin.ini",
+            "r/r 68-128-1:\tpagefile.sys",
+        ]
+        entries = FsEntry.tree_from_lines(lines, None)
+
+        assert [e.name for e in entries] == ["Windows", "pagefile.sys"]
+        assert [e.name for e in entries[0].children()] == ["System32", "win.ini"]
+        assert str(entries[0].child("System32").child("cmd.exe").path) == "Windows/System32/cmd.exe"
+
+        # Directories without listed children may not have been recursed into by `fls`
+        entries = FsEntry.tree_from_lines(["d/d 69-144-1:\tEmpty", "d/d * 70-144-1:\tGone"], None)
+
+        assert entries[0]._children is None
+        assert entries[1]._children is None
+
+        with pytest.raises(ValueError):
+            FsEntry.tree_from_lines(["+ r/r 66-128-1:\tcmd.exe"], None)
+
+    def test_find_entries(self):
+
+        lines = ["r/r 1-128-1:\tSAM", "r/r 2-128-1:\tSAM.LOG1", "r/r 3-128-1:\tsystem"]
+        entries = FsEntryList(FsEntry.from_lines(lines, None, case_insensitive=True))
+
+        assert [e.name for e in entries.find_entries("sam*")] == ["SAM", "SAM.LOG1"]
+        assert [e.name for e in entries.find_entries("[RS]Y?TEM")] == ["system"]
+        assert [e.name for e in entries.find_entries("*")] == ["SAM", "SAM.LOG1", "system"]
+
+        entries = FsEntryList(FsEntry.from_lines(lines, None, case_insensitive=False))
+
+        assert [e.name for e in entries.find_entries("sam*")] == []
+        assert [e.name for e in entries.find_entries("S*")] == ["SAM", "SAM.LOG1"]
+
+    def test_plan_tree(self):
+        from pathlib import Path
+
+        from sleuthlib.fls_types import _plan_tree
+
+        # Deeper than the recursion limit
+        depth = 2000
+        lines = [f"{'+' * i}{' ' if i else ''}d/d {i + 1}-144-1:\tdir" for i in range(depth)]
+        lines.append(f"{'+' * depth} r/r {depth + 1}-128-1:\tfile.txt")
+        entries = FsEntry.tree_from_lines(lines, None)
+        dirs: list[Path] = []
+        files: list[tuple[FsEntry, Path]] = []
+
+        _plan_tree(entries, Path("out"), dirs, files)
+
+        assert len(dirs) == depth
+        assert dirs[-1] == Path("out", *["dir"] * depth)
+        assert [(entry.name, path) for entry, path in files] == [("file.txt", dirs[-1])]
+
+    def test_meta_address(self):
+        import re
+
+        valid = ["5", "0", "1304", "5-128-1", "1304-128-12"]
+        invalid = ["", "-1", "5-", "5-128", "5--1", "5-128-1-", "5-128-1-2", "a", "a-b-c", "5-a-1"]
+
+        for address in valid:
+            meta_address = MetaAddress(address)
+            assert meta_address.inode == int(address.partition("-")[0])
+            assert meta_address.is_ntfs() == ("-" in address)
+        for address in invalid:
+            with pytest.raises(ValueError):
+                MetaAddress(address)
+
+        # Same accepted set as the pattern embedded in the fls entry regex
+        pattern = re.compile(MetaAddress.ADDRESS_PATTERN)
+        for address in valid + invalid:
+            assert (pattern.fullmatch(address) is not None) == (address in valid)
@@ -56,6 +56,53 @@ Units are in 512-byte sectors
         assert table.filesystem_partitions()[1].start == Sectors(206848)
         assert table.filesystem_partitions()[2].start == Sectors(239616)
     
+    def test_header(self):
+
+        header = [
+            "GUID Partition Table (EFI)",
+            "Offset Sector: 63",
+            "Units are in 4096-byte sectors",
+        ]
+
+        table = PartitionTable.from_lines(header, [], None)
+
+        assert table.part_table_type == PartTableType.GPT
+        assert table.offset == Sectors(63)
+        assert table.sector_size == 4096
+        assert table.partitions == []
+
+        # Surrounding whitespace is ignored
+        lines = ["", "  Offset Sector: 0  ", "Units are in 512-byte sectors\r"]
+        table = PartitionTable.from_lines(lines, [], None)
+
+        assert table.part_table_type == PartTableType.UNKNOWN
+        assert table.offset == Sectors(0)
+        assert table.sector_size == 512
+
+        # Malformed headers (including a bare number without the `Offset Sector:` prefix)
+        for offset_line in (
+            "63",
+            "Offset Sector:",
+            "Offset Sector: x",
+            "Offset: 63",
+            "Offset Sector: 63 sectors",
+        ):
+            with pytest.raises(ValueError, match="offset"):
+                PartitionTable.from_lines(["", offset_line, header[2]], [], None)
+
+        for size_line in (
+            "512",
+            "Units are in 512",
+            "512-byte sectors",
+            "Units are in -byte sectors",
+            "Units are in 5l2-byte sectors",
+        ):
+            with pytest.raises(ValueError, match="sector size"):
+                PartitionTable.from_lines(["", header[1], size_line], [], None)
+
+        with pytest.raises(ValueError):
+            PartitionTable.from_lines([], [], None)
+
     def test_partitions(self):
 
         table = PartitionTable.from_str(r'''
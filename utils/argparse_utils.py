@@ -1,10 +1,15 @@
-from argparse import Action, ArgumentParser, ArgumentTypeError, Namespace
+import sys
 from dataclasses import dataclass
-from typing import Any, Callable, Literal, Mapping, Sequence, TypeVar
+from importlib import import_module
+from typing import Any, Callable, Literal, Mapping, Sequence
 
 from sleuthlib.types import IMG_TYPES, PART_TABLE_TYPES, ImgType, Sectors, VsType
 
-_T = TypeVar("_T")
+# The argparse parser is only imported when needed (see `parse_args`), as argparse is slow to import
+_LAZY_NAMES = {
+    "ListableAction": "argparse_parser",
+    "int_min": "argparse_parser",
+}
 
 
 @dataclass(frozen=True)
@@ -17,6 +22,7 @@ class Arguments:
     imgtype: ImgType | None
     sector_size: int | None
     offset: Sectors | None
+    cache_dir: str | None
     part_num: list[int] | None
     ask_part: bool
     ls: bool
@@ -26,197 +32,183 @@ class Arguments:
     out_dir: str | None
     config: str | None
     case_sensitive: bool
+    jobs: int
     silent: bool
     verbose: int
 
 
-class ListableAction(Action):
-    """Argparse action that shows the supported choices for an argument if the value is `list`."""
-
-    def __init__(
-        self,
-        option_strings: Sequence[str],
-        dest: str,
-        nargs: int | Literal["?", "*", "+"] | None = None,
-        default: _T | None = None,
-        type: Callable[[str], _T] | None = None,
-        choices: Mapping[str, str] | None = None,
-        required: bool = False,
-        help: str | None = None,
-        metavar: str | tuple[str, ...] | None = None,
-    ) -> None:
-        if choices is None or not isinstance(choices, Mapping):
-            raise ValueError("choices must be a mapping of option names -> descriptions")
-        super(ListableAction, self).__init__(
-            option_strings=option_strings,
-            dest=dest,
-            nargs=nargs,
-            default=default,
-            type=type,
-            choices=set(choices.keys()) | {"list"},
-            required=required,
-            help=help,
-            metavar=metavar,
-        )
-        self._choices_map = choices
-
-    def __call__(
-        self,
-        parser: ArgumentParser,
-        namespace: Namespace,
-        values: str | Sequence[Any] | None,
-        option_string: str | None = None,
-    ) -> None:
-        setattr(namespace, self.dest, values)
-        if values is None:
-            values = []
-        elif isinstance(values, str):
-            values = [values]
-        if "list" in values:
-            print(f"Supported choices for {self.metavar or self.dest}:")
-            for k, v in self._choices_map.items():
-                print(f"  {k}: {v}")
-            parser.exit()
-
-
-def int_min(min_val: int = 0) -> Callable[[str], int]:
-    """Returns a function that converts a string to an integer, ensuring its value is >= min_val."""
-
-    def int_min_inner(value: str) -> int:
+def __getattr__(name: str) -> Any:
+    if (module := _LAZY_NAMES.get(name)) is None:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+    value = getattr(import_module(f".{module}", __package__), name)
+    globals()[name] = value  # Only look it up once
+    return value
+
+
+@dataclass(frozen=True)
+class _Option:
+    """Specification of a CLI option for the single-pass parser (mirrors `build_parser`)."""
+
+    dest: str
+    action: Literal["store", "store_true", "count", "extend"] = "store"
+    type: Callable[[str], Any] | None = None
+    choices: Mapping[str, str] | None = None
+    default: Any = None
+    min_value: int | None = None
+    """Minimum value of integer options (like `int_min`, without requiring argparse)."""
+
+
+_OPTIONS: dict[tuple[str, str], _Option] = {
+    ("-T", "--tsk-path"): _Option("tsk_path"),
+    ("-t", "--vstype"): _Option("vstype", choices=PART_TABLE_TYPES),
+    ("-i", "--imgtype"): _Option("imgtype", choices=IMG_TYPES),
+    ("-b", "--sector-size"): _Option("sector_size", type=int, min_value=512),
+    ("-o", "--offset"): _Option("offset", type=int, min_value=0),
+    ("-C", "--cache-dir"): _Option("cache_dir"),
+    ("-p", "--part-num"): _Option("part_num", "extend", type=int, min_value=0),
+    ("-P", "--ask-part"): _Option("ask_part", "store_true"),
+    ("-l", "--list"): _Option("ls", "store_true"),
+    ("-a", "--save-all"): _Option("save_all", "store_true"),
+    ("-f", "--file"): _Option("file", "extend"),
+    ("-F", "--file-list"): _Option("file_list", "extend"),
+    ("-d", "--out-dir"): _Option("out_dir"),
+    ("-c", "--config"): _Option("config"),
+    ("-S", "--case-sensitive"): _Option("case_sensitive", "store_true"),
+    ("-j", "--jobs"): _Option("jobs", type=int, default=1, min_value=1),
+    ("-s", "--silent"): _Option("silent", "store_true"),
+    ("-v", "--verbose"): _Option("verbose", "count"),
+}
+_SHORT_OPTIONS = {short: opt for (short, _), opt in _OPTIONS.items()}
+_LONG_OPTIONS = {long: opt for (_, long), opt in _OPTIONS.items()}
+_EXCLUSIVE_DESTS = (("part_num", "ask_part"), ("ls", "save_all"), ("silent", "verbose"))
+_DEFAULTS: dict[str, Any] = {
+    opt.dest: (False if opt.action == "store_true" else 0 if opt.action == "count" else opt.default)
+    for opt in _OPTIONS.values()
+}
+
+
+def _is_option(arg: str) -> bool:
+    return len(arg) > 1 and arg[0] == "-"
+
+
+def _parse_args_fast(argv: Sequence[str]) -> dict[str, Any] | None:
+    """Parses the CLI arguments in a single pass, without building an argparse parser.
+    Returns `None` if anything is unusual (help, `list` choice, invalid or ambiguous arguments),
+    in which case the caller should fall back to argparse to handle it or report the error."""
+    values = _DEFAULTS.copy()
+    seen: set[str] = set()
+    image: list[str] = []
+    i, n = 0, len(argv)
+    while i < n:
+        arg = argv[i]
+        i += 1
+        if not _is_option(arg):
+            if image:  # Positional arguments must be contiguous
+                return None
+            j = i - 1
+            while i < n and not _is_option(argv[i]):
+                i += 1
+            image.extend(argv[j:i])
+            continue
+
+        inline: str | None = None
+        if arg.startswith("--"):
+            name, sep, value = arg.partition("=")
+            if (opt := _LONG_OPTIONS.get(name)) is None:
+                return None
+            if sep:
+                inline = value
+        else:
+            if (opt := _SHORT_OPTIONS.get(arg[:2])) is None:
+                return None
+            if len(arg) > 2:
+                inline = arg[2:]
+
+        if opt.action == "store_true" or opt.action == "count":
+            flags = [opt]
+            if inline is not None:
+                if arg.startswith("--"):
+                    return None
+                # Clustered short flags, eg. `-vv` or `-lS`
+                for c in inline:
+                    flag = _SHORT_OPTIONS.get(f"-{c}")
+                    if flag is None or flag.action not in ("store_true", "count"):
+                        return None
+                    flags.append(flag)
+            for flag in flags:
+                values[flag.dest] = True if flag.action == "store_true" else values[flag.dest] + 1
+                seen.add(flag.dest)
+            continue
+
+        if inline is not None:
+            if not arg.startswith("--"):
+                # Like argparse, `-F=files.yaml` is the same as `-F files.yaml`
+                inline = inline.removeprefix("=")
+            raw: Sequence[str] = [inline]
+        else:
+            j = i
+            if opt.action == "extend":
+                while i < n and not _is_option(argv[i]):
+                    i += 1
+            elif i < n and not _is_option(argv[i]):
+                i += 1
+            if i == j:
+                return None
+            raw = argv[j:i]
+
+        if opt.choices is not None and any(v not in opt.choices for v in raw):
+            return None
         try:
-            n = int(value)
-        except ValueError as e:
-            raise ArgumentTypeError(str(e))
-        if n < min_val:
-            raise ArgumentTypeError(f"should be an integer >= {min_val}")
-        return n
-
-    return int_min_inner
-
-
-def parse_args() -> Arguments:
-    """Parses the CLI arguments using argparse, and returns them as a typed dataclass."""
-    parser = ArgumentParser(description="'The Sleuth Kit' Python Interface")
-    parser.add_argument(
-        "image", nargs="+", help="The image file(s) to analyze (if multiple, concatenate them)"
-    )
-
-    grp_tsk = parser.add_argument_group("The Sleuth Kit options")
-    grp_tsk.add_argument(
-        "-T",
-        "--tsk-path",
-        help="The directory where the TSK tools are installed (default: search in PATH)",
-    )
-    grp_tsk.add_argument(
-        "-t",
-        "--vstype",
-        action=ListableAction,
-        choices=PART_TABLE_TYPES,
-        help="The type of volume system (use '-t list' to list supported types)",
-    )
-    grp_tsk.add_argument(
-        "-i",
-        "--imgtype",
-        action=ListableAction,
-        choices=IMG_TYPES,
-        help="The format of the image file (use '-i list' to list supported types)",
-    )
-    grp_tsk.add_argument(
-        "-b",
-        "--sector-size",
-        type=int_min(512),
-        help="The size (in bytes) of the device sectors",
-    )
-    grp_tsk.add_argument(
-        "-o",
-        "--offset",
-        type=int_min(0),
-        help="Offset to the start of the volume that contains the partition system (in sectors)",
-    )
-
-    grp_extract = parser.add_argument_group("Extraction options")
-    xgrp_partition = grp_extract.add_mutually_exclusive_group()
-    xgrp_partition.add_argument(
-        "-p",
-        "--part-num",
-        action="extend",
-        nargs="+",
-        type=int_min(0),
-        help="The partition number(s) (slots) to use (if not specified, use all NTFS partitions)",
-    )
-    xgrp_partition.add_argument(
-        "-P",
-        "--ask-part",
-        action="store_true",
-        help="List data partitions and ask for which one(s) to use",
-    )
-    xgrp_list_save = grp_extract.add_mutually_exclusive_group()
-    xgrp_list_save.add_argument(
-        "-l",
-        "--list",
-        action="store_true",
-        dest="ls",
-        help="If no file is specified, list all partitions; otherwise, list the given files",
-    )
-    xgrp_list_save.add_argument(
-        "-a",
-        "--save-all",
-        action="store_true",
-        help="Save all files and directories in the partition",
-    )
-    grp_extract.add_argument(
-        "-f",
-        "--file",
-        action="extend",
-        nargs="+",
-        help="The file(s)/dir(s) to extract",
-    )
-    grp_extract.add_argument(
-        "-F",
-        "--file-list",
-        action="extend",
-        nargs="+",
-        help="YAML file(s) containing the file(s)/dir(s) to extract, with tools to use and options",
-    )
-    grp_extract.add_argument(
-        "-d",
-        "--out-dir",
-        help="The directory to extract the file(s)/dir(s) to",
-    )
-    grp_extract.add_argument(
-        "-c",
-        "--config",
-        help="The YAML file containing the configuration of the tools to use and directories",
-    )
-    grp_extract.add_argument(
-        "-S",
-        "--case-sensitive",
-        action="store_true",
-        help="Case-sensitive file search (default is case-insensitive)",
-    )
-
-    xgrp_verbosity = parser.add_mutually_exclusive_group()
-    xgrp_verbosity.add_argument(
-        "-s",
-        "--silent",
-        action="store_true",
-        help="Suppress output",
-    )
-    xgrp_verbosity.add_argument(
-        "-v",
-        "--verbose",
-        action="count",
-        default=0,
-        help="Verbose output (use multiple times for more verbosity)",
-    )
-
-    args = parser.parse_args()
+            converted = raw if opt.type is None else [opt.type(v) for v in raw]
+        except ValueError:
+            return None
+        if opt.min_value is not None and any(v < opt.min_value for v in converted):
+            return None
+        if opt.action == "extend":
+            # All the values of an occurrence are added at once (argparse copies the list each time);
+            # `converted` is always a new list, so the first occurrence can use it as is
+            if values[opt.dest] is None:
+                values[opt.dest] = converted
+            else:
+                values[opt.dest].extend(converted)
+        else:
+            values[opt.dest] = converted[0]
+        seen.add(opt.dest)
+
+    if not image:
+        return None
+    if any(a in seen and b in seen for a, b in _EXCLUSIVE_DESTS):
+        return None
+    if values["save_all"] and (values["file"] or values["file_list"]):
+        return None
+    values["image"] = image
+    return values
+
+
+def _parse_args_argparse(argv: Sequence[str]) -> dict[str, Any]:
+    """Parses the CLI arguments using argparse (exits on `--help`, `list` choices, and errors)."""
+    from .argparse_parser import build_parser
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
 
     if args.save_all and (args.file or args.file_list):
         parser.error("cannot specify --save-all and --file/--file-list at the same time")
 
-    if args.part_num is not None:
+    return args.__dict__
+
+
+def parse_args(argv: Sequence[str] | None = None) -> Arguments:
+    """Parses the CLI arguments, and returns them as a typed dataclass.
+    Common command lines are handled by a single-pass parser; argparse is only used
+    for `--help`, `list` choices, and to report errors."""
+    if argv is None:
+        argv = sys.argv[1:]
+    if (values := _parse_args_fast(argv)) is None:
+        values = _parse_args_argparse(argv)
+
+    if values["part_num"] is not None:
         # Remove duplicates while preserving order
-        args.part_num = list(dict.fromkeys(args.part_num).keys())
+        values["part_num"] = list(dict.fromkeys(values["part_num"]).keys())
 
-    return Arguments(**args.__dict__)
+    return Arguments(**values)
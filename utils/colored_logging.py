@@ -1,4 +1,5 @@
 import logging
+import sys
 from os import environ
 from sys import exit, platform
 from typing import Any, NoReturn, overload
@@ -13,11 +14,18 @@ LOGLEVEL_COLORS: dict[int, tuple[Color, list[Attribute]]] = {
     logging.ERROR: ("red", []),
     logging.CRITICAL: ("red", ["bold"]),
 }
+USE_COLORS = "NO_COLOR" not in environ and (sys.stdout.isatty() or "FORCE_COLOR" in environ)
+"""Whether the output may be colored. If not, termcolor would not output colors anyway,
+so the messages are formatted without calling it."""
 
 
 def init_logging_colors() -> None:
     """Initializes terminal colors with colorama if necessary
-    and sets up logging levels with colors."""
+    and sets up logging levels with colors.
+    Does nothing if the output is not a terminal (termcolor does not output colors then),
+    unless `FORCE_COLOR` is set (see `USE_COLORS`)."""
+    if not USE_COLORS:
+        return
     if platform == "win32" and "WT_SESSION" not in environ:
         try:
             from colorama import just_fix_windows_console
@@ -33,6 +41,20 @@ def init_logging_colors() -> None:
         logging.addLevelName(level, colored(name, color, attrs=attrs))
 
 
+def format_log(
+    msg: str, /, *, prefix_char: str = "*", color: Color = "cyan", attrs: list[Attribute] = []
+) -> str:
+    """Formats a message with a colored prefix (eg. `[*] msg`), without printing it."""
+    if not USE_COLORS:
+        return f"[{prefix_char}] {msg}"
+    return f"[{colored(prefix_char, color, attrs=attrs)}] {msg}"
+
+
+def format_info(msg: str, /) -> str:
+    """Formats an info message (eg. `[*] msg`), like `print_info` but without printing it."""
+    return format_log(msg, prefix_char="*", color="cyan")
+
+
 def print_log(
     msg: str,
     /,
@@ -42,7 +64,14 @@ def print_log(
     attrs: list[Attribute] = [],
     **kwargs: Any,
 ) -> None:
-    print(f"[{colored(prefix_char, color, attrs=attrs)}] {msg}", **kwargs)
+    # The line ending is written with the message, so that lines printed by
+    # concurrent threads are not interleaved
+    end = kwargs.pop("end", "\n")
+    print(
+        f"{format_log(msg, prefix_char=prefix_char, color=color, attrs=attrs)}{end}",
+        end="",
+        **kwargs,
+    )
 
 
 def print_info(msg: str, /, **kwargs: Any) -> None:
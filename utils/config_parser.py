@@ -6,9 +6,8 @@ from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any, TypedDict, get_type_hints
 
-import yaml
-
 from .colored_logging import print_error
+from .yaml_utils import load_yaml_file
 
 if sys.version_info >= (3, 11):
     from typing import NotRequired, Self
@@ -159,10 +158,10 @@ class Config:
 
     @classmethod
     def from_yaml_file(cls, yaml_file_path: str | Path) -> Self:
-        """Parses a YAML file and creates a list of `Tool`s and directories."""
+        """Parses a YAML file and creates a list of `Tool`s and directories.
+        The parsed YAML data is cached (see `load_yaml_file`)."""
         try:
-            with open(yaml_file_path, "r") as file:
-                data: Config.YamlConfig | Any = yaml.safe_load(file)
+            data: Config.YamlConfig | Any = load_yaml_file(yaml_file_path)
         except FileNotFoundError:
             print_error(f"Config file '{yaml_file_path}' not found", exit_code=1)
         return cls.from_dict(data)
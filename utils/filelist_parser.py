@@ -4,15 +4,15 @@ import logging
 import subprocess
 import sys
 from dataclasses import dataclass, field
+from functools import cached_property
 from graphlib import TopologicalSorter
 from pathlib import Path, PurePath
 from typing import Any, Iterable, Iterator, TypedDict, overload
 
-import yaml
-
 from .colored_logging import print_error
 from .config_parser import Config
 from .variable_utils import get_username, sub_vars
+from .yaml_utils import load_yaml_file
 
 if sys.version_info >= (3, 11):
     from typing import NotRequired, Self
@@ -389,6 +389,11 @@ class FileList:
                 return cls.from_str(file, file_list)
             return file
 
+        @cached_property
+        def parts(self) -> tuple[str, ...]:
+            """The components of the path, as accepted by `FsEntryList.find_path`."""
+            return tuple(part for part in self.path.split("/") if part not in ("", "."))
+
         @staticmethod
         def normalize_path(path: str) -> str:
             """Normalizes a path by replacing backslashes with forward slashes
@@ -416,10 +421,10 @@ class FileList:
     @classmethod
     def from_yaml_file(cls, yaml_file: str | Path, config: Config) -> Self:
         """Parses a YAML file and return a list of files/directories to extract,
-        and optionally tools to run on them."""
+        and optionally tools to run on them. The parsed YAML data is cached
+        (see `load_yaml_file`)."""
         try:
-            with open(yaml_file, "r") as file:
-                data: FileList.YamlFiles | Any = yaml.safe_load(file)
+            data: FileList.YamlFiles | Any = load_yaml_file(yaml_file)
         except FileNotFoundError:
             print_error(f"File '{yaml_file}' not found", exit_code=1)
         return cls.from_dict(data, config)
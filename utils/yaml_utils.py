@@ -0,0 +1,21 @@
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+import yaml
+
+
+def load_yaml_file(yaml_file_path: str | Path) -> Any:
+    """Parses a YAML file and returns its content. Raises FileNotFoundError if it does not exist.
+    Results are cached by path and modification time, so loading the same unchanged file again
+    does not re-parse it. The returned data is shared between callers and must not be modified."""
+    path = os.path.abspath(yaml_file_path)
+    return _load_yaml_cached(path, os.stat(path).st_mtime_ns)
+
+
+@lru_cache(maxsize=32)
+def _load_yaml_cached(path: str, mtime_ns: int) -> Any:
+    # `mtime_ns` is only used as part of the cache key, to reload the file if it changed
+    with open(path, "r") as file:
+        return yaml.safe_load(file)